@@ -0,0 +1,132 @@
+import os
+from threading import Lock, local
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from meilisearch import Client
+from meilisearch._httprequests import HttpRequests
+from meilisearch.config import Config
+from meilisearch.index import Index
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_clients: Dict[Tuple[str, str], "PooledClient"] = {}
+_clients_lock = Lock()
+
+
+class PooledHttpRequests(HttpRequests):
+    """
+    `HttpRequests` sending its requests through a shared `requests.Session`.
+
+    `HttpRequests` is private, hence the SDK version pinned in pyproject.toml.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        session: requests.Session,
+        custom_headers: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self._local = local()
+        super().__init__(config, custom_headers)
+        self._base_headers = dict(self.headers)
+        self.session = session
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        if not hasattr(self._local, "headers"):
+            self._local.headers = dict(self._base_headers)
+        return self._local.headers
+
+    @headers.setter
+    def headers(self, value: Dict[str, str]) -> None:
+        self._base_headers = value
+        self._local.headers = dict(value)
+
+    def send_request(self, http_method: Callable, *args: Any, **kwargs: Any) -> Any:
+        # Same method, bound to the session (the SDK relies on its name)
+        http_method = getattr(self.session, http_method.__name__)
+        return super().send_request(http_method, *args, **kwargs)
+
+
+class PooledClient(Client):
+    """A Meilisearch `Client` whose requests (and those of its indexes) share a pool."""
+
+    def __init__(
+        self,
+        url: str,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        pool_size: int = 10,
+        retries: int = 0,
+    ) -> None:
+        super().__init__(url, api_key, timeout=timeout)  # type: ignore
+        self.session = requests.Session()
+        # Only connection errors and 502/503/504 on idempotent methods are retried,
+        # and the last response is returned for the SDK to raise its own error
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.1,
+            status_forcelist=(502, 503, 504) if retries > 0 else None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.http = self.http_requests()
+        self.task_handler.http = self.http_requests()
+
+    def index(self, uid: str) -> Index:
+        index = super().index(uid)
+        index.http = self.http_requests()
+        index.task_handler.http = self.http_requests()
+        return index
+
+    def http_requests(
+        self, custom_headers: Optional[Mapping[str, str]] = None
+    ) -> PooledHttpRequests:
+        """Returns an `HttpRequests` using the pool of this client."""
+        return PooledHttpRequests(self.config, self.session, custom_headers)
+
+    def close(self) -> None:
+        """Closes the pooled connections."""
+        self.session.close()
+
+
+def get_meilisearch_client(
+    host: str,
+    api_key: str,
+    timeout: Optional[float] = None,
+    pool_size: int = 10,
+    retries: int = 0,
+) -> PooledClient:
+    """Returns the client shared by everyone for this host and API key."""
+    key = (host, api_key)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = PooledClient(host, api_key, timeout, pool_size, retries)
+                _clients[key] = client
+    return client
+
+
+def reset_meilisearch_clients() -> None:
+    """Closes and forgets all the shared clients."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def _forget_clients_after_fork() -> None:
+    """Child processes must not reuse the connections of their parent."""
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = Lock()
+
+
+os.register_at_fork(after_in_child=_forget_clients_after_fork)
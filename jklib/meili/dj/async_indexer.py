@@ -0,0 +1,488 @@
+import asyncio
+import json
+from time import monotonic
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    Unpack,
+)
+from weakref import WeakKeyDictionary
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q, QuerySet
+import httpx
+from meilisearch.errors import MeilisearchApiError, MeilisearchTimeoutError
+from meilisearch.models.task import Task, TaskInfo
+
+from jklib.meili.dj.indexer import BaseMeilisearchModelIndexer, M
+from jklib.meili.exceptions import (
+    FailedBatch,
+    MeilisearchIndexingError,
+    MeilisearchTaskError,
+)
+from jklib.meili.metrics import (
+    INDEX_FETCH_ROWS,
+    INDEX_FETCH_SECONDS,
+    INDEX_UPLOAD_BYTES,
+    INDEX_UPLOAD_SECONDS,
+    SEARCH_CLIENT_SECONDS,
+    SEARCH_SERVER_SECONDS,
+)
+from jklib.meili.search import SearchFilter, resolve_search_filter
+from jklib.meili.types import (
+    MeilisearchSearchHits,
+    MeilisearchSearchParameters,
+    MeilisearchSearchResults,
+)
+
+# One HTTP client per event loop, and per (host, api key)
+_http_clients: WeakKeyDictionary[
+    asyncio.AbstractEventLoop, Dict[Tuple[str, str], httpx.AsyncClient]
+] = WeakKeyDictionary()
+
+
+class AsyncMeilisearchModelIndexer(BaseMeilisearchModelIndexer[M]):
+    """
+    Asyncio counterpart of `MeilisearchModelIndexer`, built on `httpx`.
+
+    It shares one HTTP client per event loop, host and API key.
+    """
+
+    INDEX_MAX_CONCURRENCY = 4
+
+    # --------------------------------------------------
+    # Index management
+    # --------------------------------------------------
+    @classmethod
+    async def index_exists(cls) -> bool:
+        """Returns True if the index exists."""
+        cls._check_unsharded()
+        return await cls._index_exists(cls.index_name())
+
+    @classmethod
+    async def maybe_create_index(cls) -> List[TaskInfo]:
+        """Creates the index if it doesn't exist."""
+        tasks = []
+        if not await cls.index_exists():
+            tasks.append(await cls._create_index(cls.index_name()))
+        settings_task = await cls.update_settings()
+        if settings_task is not None:
+            tasks.append(settings_task)
+        return tasks
+
+    @classmethod
+    async def update_settings(
+        cls, wait: bool = False, timeout: Optional[float] = None
+    ) -> Optional[TaskInfo]:
+        """Updates the index settings that differ from the current ones."""
+        cls._check_unsharded()
+        index_name = cls.index_name()
+        try:
+            current = await cls._request("GET", f"indexes/{index_name}/settings")
+        except MeilisearchApiError as error:
+            if error.code != "index_not_found":
+                raise
+            current = {}
+        changes = cls._diff_settings(current)
+        if len(changes) == 0:
+            return None
+        response = await cls._request(
+            "PATCH", f"indexes/{index_name}/settings", json=changes
+        )
+        task = TaskInfo(**response)
+        if wait:
+            await cls.wait_for_tasks([task], timeout)
+        return task
+
+    # --------------------------------------------------
+    # Indexing
+    # --------------------------------------------------
+    @classmethod
+    async def index(cls, instance: M) -> TaskInfo:
+        """Indexes the model instance."""
+        return await cls.index_multiple([instance])
+
+    @classmethod
+    async def index_multiple(cls, instances: Iterable[M]) -> TaskInfo:
+        """Indexes multiple model instances."""
+        cls._check_unsharded()
+        objects = await sync_to_async(cls._build_documents)(instances)
+        return await cls._add_documents(cls.index_name(), objects)
+
+    @classmethod
+    async def update(cls, instance: M, fields: Iterable[str]) -> Optional[TaskInfo]:
+        """Partially updates the indexed instance after a change of `fields`."""
+        return await cls.update_multiple([instance], fields)
+
+    @classmethod
+    async def update_multiple(
+        cls, instances: Iterable[M], fields: Iterable[str]
+    ) -> Optional[TaskInfo]:
+        """Partially updates multiple indexed instances after a change of `fields`."""
+        cls._check_unsharded()
+        attributes = cls._changed_attributes(fields)
+        if attributes is None:
+            return await cls.index_multiple(instances)
+        if len(attributes) == 0:
+            return None
+        objects = await sync_to_async(cls._build_partial_documents)(
+            instances, attributes
+        )
+        return await cls._update_documents(cls.index_name(), objects)
+
+    @classmethod
+    async def index_from_query(
+        cls, query: Q, batch_size: Optional[int] = None
+    ) -> List[TaskInfo]:
+        """Indexes all the instances matching the query."""
+        cls._check_unsharded()
+        return await cls._index_from_query(query, cls.index_name(), batch_size)
+
+    @classmethod
+    async def index_all(cls, batch_size: Optional[int] = None) -> List[TaskInfo]:
+        """Indexes all the instances of the model."""
+        cls._check_unsharded()
+        return await cls._index_from_query(Q(), cls.index_name(), batch_size)
+
+    @classmethod
+    async def index_all_atomically(
+        cls, batch_size: Optional[int] = None, timeout: Optional[float] = None
+    ) -> List[TaskInfo]:
+        """
+        Indexes all the instances of the model atomically.
+
+        Returns the swap and cleanup tasks.
+        """
+        cls._check_unsharded()
+        tmp_index_name = f"{cls.index_name()}_tmp"
+        tasks = []
+        if await cls._index_exists(tmp_index_name):
+            response = await cls._request("DELETE", f"indexes/{tmp_index_name}")
+            tasks.append(TaskInfo(**response))
+        tasks.append(await cls._create_index(tmp_index_name))
+        tasks.append(await cls._update_settings(tmp_index_name))
+        tasks.extend(await cls._index_from_query(Q(), tmp_index_name, batch_size))
+        await cls.wait_for_tasks(tasks, timeout)
+        swap_task = await cls._request(
+            "POST",
+            "swap-indexes",
+            json=[{"indexes": [cls.index_name(), tmp_index_name]}],
+        )
+        delete_task = await cls._request("DELETE", f"indexes/{tmp_index_name}")
+        return [TaskInfo(**swap_task), TaskInfo(**delete_task)]
+
+    @classmethod
+    async def unindex(cls, id_: int) -> TaskInfo:
+        """Deletes the instance from the index."""
+        return await cls.unindex_multiple([id_])
+
+    @classmethod
+    async def unindex_multiple(cls, ids: Union[List[int], List[str]]) -> TaskInfo:
+        """Deletes multiple instances from the index."""
+        cls._check_unsharded()
+        response = await cls._request(
+            "POST", f"indexes/{cls.index_name()}/documents/delete-batch", json=ids
+        )
+        return TaskInfo(**response)
+
+    @classmethod
+    async def unindex_by_filters(cls, filters: SearchFilter) -> TaskInfo:
+        """Deletes the documents matching the filters from the index, in one request."""
+        cls._check_unsharded()
+        expression = resolve_search_filter(filters)
+        if expression is None:
+            raise ValueError("Cannot unindex by filters without any filter")
+        response = await cls._request(
+            "POST",
+            f"indexes/{cls.index_name()}/documents/delete",
+            json={"filter": expression},
+        )
+        return TaskInfo(**response)
+
+    @classmethod
+    async def unindex_from_query(
+        cls, query: Q, batch_size: Optional[int] = None
+    ) -> List[TaskInfo]:
+        """Deletes the instances matching the query from the index, in batches."""
+        cls._check_unsharded()
+        batch_size = batch_size or cls.INDEX_BATCH_SIZE
+        queryset = cls._ids_queryset(query)
+        tasks = []
+        rows = [row async for row in queryset[:batch_size]]
+        while len(rows) > 0:
+            tasks.append(await cls.unindex_multiple([id_ for _, id_ in rows]))
+            if len(rows) < batch_size:
+                break
+            last_pk = rows[-1][0]
+            rows = [row async for row in queryset.filter(pk__gt=last_pk)[:batch_size]]
+        return tasks
+
+    # --------------------------------------------------
+    # Searching
+    # --------------------------------------------------
+    @classmethod
+    async def search(
+        cls,
+        query: str,
+        only_hits: bool = False,
+        filters: SearchFilter = None,
+        **params: Unpack[MeilisearchSearchParameters],
+    ) -> Union[MeilisearchSearchHits, MeilisearchSearchResults]:
+        cls._check_unsharded()
+        params["filter"] = resolve_search_filter(filters)
+        start = monotonic()
+        response: MeilisearchSearchResults = await cls._request(
+            "POST", f"indexes/{cls.index_name()}/search", json={"q": query, **params}
+        )
+        cls._emit(SEARCH_CLIENT_SECONDS, monotonic() - start)
+        cls._emit(SEARCH_SERVER_SECONDS, response.get("processingTimeMs", 0) / 1000)
+        if only_hits:
+            return {"hits": response["hits"]}
+        return response
+
+    @classmethod
+    async def iter_hits(
+        cls,
+        query: str = "",
+        filters: SearchFilter = None,
+        batch_size: int = 1000,
+        **params: Unpack[MeilisearchSearchParameters],
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yields every hit of the search, fetching `batch_size` of them at a time."""
+        cls._check_unsharded()
+        cls._check_hits_pagination(batch_size, params)
+        expression = resolve_search_filter(filters)
+        fields = params.get("attributesToRetrieve")
+        if query == "" and params.keys() <= {"attributesToRetrieve"}:
+            path = f"indexes/{cls.index_name()}/documents/fetch"
+            body: Dict[str, Any] = {"limit": batch_size}
+            if expression is not None:
+                body["filter"] = expression
+            if fields is not None:
+                body["fields"] = fields
+            offset = 0
+            while True:
+                response = await cls._request(
+                    "POST", path, json={**body, "offset": offset}
+                )
+                for document in response["results"]:
+                    yield document
+                if len(response["results"]) < batch_size:
+                    return
+                offset += batch_size
+        params["limit"] = batch_size
+        offset = params.pop("offset", None) or 0
+        while True:
+            params["offset"] = offset
+            response = await cls.search(query, filters=filters, **params)
+            for hit in response["hits"]:
+                yield hit
+            if len(response["hits"]) < batch_size:
+                return
+            offset += batch_size
+
+    @classmethod
+    async def search_instances(
+        cls,
+        query: str,
+        filters: SearchFilter = None,
+        queryset: Optional[QuerySet[M]] = None,
+        **params: Unpack[MeilisearchSearchParameters],
+    ) -> Tuple[List[M], MeilisearchSearchResults]:
+        """Searches the index and returns the instances of the hits with the results."""
+        params.setdefault("attributesToRetrieve", [cls.PRIMARY_KEY])
+        results: MeilisearchSearchResults = await cls.search(  # type: ignore
+            query, filters=filters, **params
+        )
+        hits_queryset = cls._hits_queryset(queryset, results["hits"])
+        return [instance async for instance in hits_queryset], results
+
+    # --------------------------------------------------
+    # Tasks
+    # --------------------------------------------------
+    @classmethod
+    async def wait_for_tasks(
+        cls, tasks: Iterable[TaskInfo], timeout: Optional[float] = None
+    ) -> List[Task]:
+        """Async version of `MeilisearchModelIndexer.wait_for_tasks`."""
+        timeout = timeout if timeout is not None else cls.TASKS_TIMEOUT
+        deadline = monotonic() + timeout
+        pending = list(dict.fromkeys(task.task_uid for task in tasks))
+        finished: Dict[int, Task] = {}
+        interval = cls.TASKS_POLL_INTERVAL
+        while len(pending) > 0:
+            for i in range(0, len(pending), cls.TASKS_POLL_SIZE):
+                uids = pending[i : i + cls.TASKS_POLL_SIZE]
+                response = await cls._request(
+                    "GET",
+                    "tasks",
+                    params={
+                        "uids": ",".join(str(uid) for uid in uids),
+                        "limit": len(uids),
+                    },
+                )
+                for task in (Task(**result) for result in response["results"]):
+                    if task.status not in ("enqueued", "processing"):
+                        finished[task.uid] = task
+            pending = [uid for uid in pending if uid not in finished]
+            if len(pending) == 0:
+                break
+            if monotonic() >= deadline:
+                raise MeilisearchTimeoutError(
+                    f"Timeout of {timeout}s exceeded while waiting for tasks {pending}"
+                )
+            await asyncio.sleep(min(interval, max(deadline - monotonic(), 0)))
+            interval = min(interval * 2, cls.TASKS_POLL_MAX_INTERVAL)
+        failed_tasks = [
+            task for task in finished.values() if task.status != "succeeded"
+        ]
+        if len(failed_tasks) > 0:
+            raise MeilisearchTaskError(failed_tasks)
+        return list(finished.values())
+
+    # --------------------------------------------------
+    # Utils
+    # --------------------------------------------------
+    @classmethod
+    def http_client(cls) -> httpx.AsyncClient:
+        """Returns the HTTP client shared by the indexers of the running loop."""
+        loop = asyncio.get_running_loop()
+        clients = _http_clients.setdefault(loop, {})
+        key = (settings.MEILISEARCH_HOST, settings.MEILISEARCH_API_KEY)
+        if key not in clients:
+            pool_size = getattr(settings, "MEILISEARCH_POOL_SIZE", 10)
+            transport = httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=pool_size, max_keepalive_connections=pool_size
+                ),
+                retries=getattr(settings, "MEILISEARCH_RETRIES", 0),
+            )
+            clients[key] = httpx.AsyncClient(
+                base_url=settings.MEILISEARCH_HOST,
+                headers={"Authorization": f"Bearer {settings.MEILISEARCH_API_KEY}"},
+                transport=transport,
+                timeout=getattr(settings, "MEILISEARCH_TIMEOUT", None),
+            )
+        return clients[key]
+
+    # --------------------------------------------------
+    # Private utils
+    # --------------------------------------------------
+    @classmethod
+    async def _request(cls, method: str, path: str, **kwargs: Any) -> Any:
+        """Sends the request and returns its JSON body, raising on API errors."""
+        response = await cls.http_client().request(method, path, **kwargs)
+        if response.status_code >= 400:
+            raise MeilisearchApiError(str(response.status_code), response)  # type: ignore
+        return response.json() if response.content else None
+
+    @classmethod
+    async def _index_exists(cls, index_name: str) -> bool:
+        response = await cls.http_client().get(f"indexes/{index_name}")
+        return response.status_code == 200
+
+    @classmethod
+    async def _create_index(cls, index_name: str) -> TaskInfo:
+        response = await cls._request(
+            "POST", "indexes", json={"uid": index_name, "primaryKey": cls.PRIMARY_KEY}
+        )
+        return TaskInfo(**response)
+
+    @classmethod
+    async def _update_settings(cls, index_name: str) -> TaskInfo:
+        response = await cls._request(
+            "PATCH", f"indexes/{index_name}/settings", json=cls.SETTINGS
+        )
+        return TaskInfo(**response)
+
+    @classmethod
+    async def _add_documents(
+        cls, index_name: str, objects: List[Dict[str, Any]]
+    ) -> TaskInfo:
+        """Uploads the objects to the given index."""
+        return await cls._send_documents("POST", index_name, objects)
+
+    @classmethod
+    async def _update_documents(
+        cls, index_name: str, objects: List[Dict[str, Any]]
+    ) -> TaskInfo:
+        """Uploads the partial objects to the given index, merging their attributes."""
+        return await cls._send_documents("PUT", index_name, objects)
+
+    @classmethod
+    async def _send_documents(
+        cls, method: str, index_name: str, objects: List[Dict[str, Any]]
+    ) -> TaskInfo:
+        payload = json.dumps(objects).encode()
+        start = monotonic()
+        response = await cls._request(
+            method,
+            f"indexes/{index_name}/documents",
+            params={"primaryKey": cls.PRIMARY_KEY},
+            content=payload,
+            headers={"Content-Type": "application/json"},
+        )
+        cls._emit(INDEX_UPLOAD_SECONDS, monotonic() - start)
+        cls._emit(INDEX_UPLOAD_BYTES, len(payload))
+        return TaskInfo(**response)
+
+    @classmethod
+    async def _index_from_query(
+        cls, query: Q, index_name: str, batch_size: Optional[int] = None
+    ) -> List[TaskInfo]:
+        """Indexes all the objects matching the query on the given index."""
+        semaphore = asyncio.Semaphore(cls.INDEX_MAX_CONCURRENCY)
+        uploads: List[asyncio.Task] = []
+        batches: List[List[Dict[str, Any]]] = []
+
+        async def _upload(objects: List[Dict[str, Any]]) -> TaskInfo:
+            try:
+                return await cls._add_documents(index_name, objects)
+            finally:
+                semaphore.release()
+
+        async for instances in cls._iter_batches(query, batch_size):
+            objects = await sync_to_async(cls._build_documents)(instances)
+            await semaphore.acquire()
+            batches.append(objects)
+            uploads.append(asyncio.create_task(_upload(objects)))
+        results = await asyncio.gather(*uploads, return_exceptions=True)
+        failed_batches = [
+            FailedBatch(index_name, number, batches[number], result)
+            for number, result in enumerate(results)
+            if isinstance(result, BaseException)
+        ]
+        if len(failed_batches) > 0:
+            raise MeilisearchIndexingError(failed_batches)
+        return results  # type: ignore
+
+    @classmethod
+    async def _iter_batches(
+        cls, query: Q, batch_size: Optional[int] = None
+    ) -> AsyncIterator[List[M]]:
+        """Async version of `MeilisearchModelIndexer._iter_batches`."""
+        batch_size = batch_size or cls.INDEX_BATCH_SIZE
+        queryset = cls.index_queryset().filter(query).order_by("pk")
+        batch = await cls._fetch_batch(queryset[:batch_size])
+        while len(batch) > 0:
+            yield batch
+            if len(batch) < batch_size:
+                return
+            last_pk = cls._row_value(batch[-1], "pk")
+            batch = await cls._fetch_batch(queryset.filter(pk__gt=last_pk)[:batch_size])
+
+    @classmethod
+    async def _fetch_batch(cls, queryset: QuerySet[M]) -> List[M]:
+        """Async version of `MeilisearchModelIndexer._fetch_batch`."""
+        start = monotonic()
+        batch = [instance async for instance in queryset]
+        cls._emit(INDEX_FETCH_SECONDS, monotonic() - start)
+        cls._emit(INDEX_FETCH_ROWS, len(batch))
+        return batch
@@ -1,30 +1,88 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import contextmanager
+from copy import deepcopy
+from functools import partial
+import gzip
+import hashlib
+from itertools import chain
+import json
+import pickle
+from threading import local
+from time import monotonic, sleep
 from typing import (
     TYPE_CHECKING,
     Any,
     Dict,
+    FrozenSet,
     Generic,
+    Iterable,
+    Iterator,
     List,
+    NamedTuple,
     Optional,
+    Self,
+    Sequence,
+    Set,
+    Tuple,
     Type,
     TypeVar,
     Union,
     Unpack,
 )
 
+import django
+from django.apps import apps
 from django.conf import settings
-from django.core.paginator import Paginator
-from django.db.models import Q, QuerySet
-from meilisearch import Client
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.db.models import Case, Max, Q, QuerySet, When
+from django.db.models.signals import post_delete, post_save
+from meilisearch.errors import MeilisearchApiError, MeilisearchTimeoutError
+from meilisearch.models.task import Task, TaskInfo
 
-from jklib.meili.search import build_search_filter
+from jklib.meili.clients import PooledClient, get_meilisearch_client
+from jklib.meili.exceptions import (
+    FailedBatch,
+    MeilisearchIndexingError,
+    MeilisearchTaskError,
+)
+from jklib.meili.metrics import (
+    INDEX_BUILD_DOCUMENTS,
+    INDEX_BUILD_SECONDS,
+    INDEX_DOCUMENTS_PER_SECOND,
+    INDEX_FETCH_ROWS,
+    INDEX_FETCH_SECONDS,
+    INDEX_THROTTLED_SECONDS,
+    INDEX_UPLOAD_BYTES,
+    INDEX_UPLOAD_SECONDS,
+    SEARCH_CLIENT_SECONDS,
+    SEARCH_SERVER_SECONDS,
+    MetricsSink,
+)
+from jklib.meili.search import (
+    SearchFilter,
+    escape_filter_value,
+    resolve_search_filter,
+)
 from jklib.meili.types import (
-    MeilisearchFilters,
+    MeilisearchDocumentsBatch,
+    MeilisearchQuery,
     MeilisearchSearchHits,
     MeilisearchSearchParameters,
     MeilisearchSearchResults,
     MeilisearchSettings,
 )
+from jklib.std.caches import LRUCache
 
 if TYPE_CHECKING:
     from django.db.models import Model
@@ -32,13 +90,82 @@ if TYPE_CHECKING:
 
 M = TypeVar("M", bound="Model")
 
+IndexerQuery = Tuple[
+    Type["MeilisearchModelIndexer"],
+    str,
+    Optional[SearchFilter],
+    Optional[MeilisearchSearchParameters],
+]
+
+_auto_sync_buffers = local()
 
-class MeilisearchModelIndexer(ABC, Generic[M]):
-    _meilisearch_client: Optional[Client] = None
+
+# Settings returned sorted by Meilisearch, regardless of their given order
+_UNORDERED_SETTINGS = {
+    "filterableAttributes",
+    "sortableAttributes",
+    "stopWords",
+    "separatorTokens",
+    "nonSeparatorTokens",
+    "disableOnWords",
+    "disableOnAttributes",
+}
+# Objects merged into their current value on update (others, like synonyms, are replaced)
+_MERGED_SETTINGS = {
+    "typoTolerance",
+    "minWordSizeForTypos",
+    "faceting",
+    "pagination",
+    "embedders",
+    "embedder",
+}
+
+
+def _same_setting(key: str, current: Any, desired: Any) -> bool:
+    """Returns True if updating the setting to `desired` would not change it."""
+    if key in _MERGED_SETTINGS and isinstance(desired, dict):
+        # Each embedder is merged as well, whatever its name
+        return isinstance(current, dict) and all(
+            _same_setting("embedder" if key == "embedders" else k, current.get(k), v)
+            for k, v in desired.items()
+        )
+    if key in _UNORDERED_SETTINGS and isinstance(desired, list):
+        return isinstance(current, list) and sorted(map(json.dumps, current)) == sorted(
+            map(json.dumps, desired)
+        )
+    return current == desired
+
+
+class ReconcileReport(NamedTuple):
+    """The outcome of `MeilisearchModelIndexer.reconcile`."""
+
+    checked: int
+    upserted: int
+    deleted: int
+    tasks: List[TaskInfo]
+
+
+class BaseMeilisearchModelIndexer(ABC, Generic[M]):
+    """Configuration and document building shared by the sync and async indexers."""
 
     MODEL_CLASS: Type[M]
     PRIMARY_KEY = "id"
     SETTINGS: MeilisearchSettings
+    INDEX_BATCH_SIZE = 500
+    INDEX_SELECT_RELATED: Sequence[str] = ()
+    INDEX_PREFETCH_RELATED: Sequence[str] = ()
+    INDEX_ONLY_FIELDS: Sequence[str] = ()
+    INDEX_HASH_ATTRIBUTE: Optional[str] = None
+    INDEX_FIELD_ATTRIBUTES: Dict[str, Sequence[str]] = {}
+    INDEX_SHARD_FIELD: Optional[str] = None
+    METRICS_SINK: Optional[MetricsSink] = None
+    TASKS_TIMEOUT = 60.0
+    TASKS_POLL_SIZE = 100
+    TASKS_POLL_INTERVAL = 0.01
+    TASKS_POLL_MAX_INTERVAL = 1.0
+    _shard: Optional[str] = None
+    _shard_parent: Optional[Type[Self]] = None
+    _shard_indexers: Dict[str, Type["BaseMeilisearchModelIndexer"]]
 
     @classmethod
     @abstractmethod
@@ -50,78 +177,571 @@ class MeilisearchModelIndexer(ABC, Generic[M]):
     def index_name(cls) -> str:
         """Returns the index name."""
 
+    @classmethod
+    def build_objects(cls, instances: Iterable[M]) -> List[Dict[str, Any]]:
+        """Builds and returns the objects to be indexed for a batch of instances."""
+        return [cls.build_object(instance) for instance in instances]
+
+    @classmethod
+    def build_partial_object(
+        cls, instance: M, attributes: Iterable[str]
+    ) -> Dict[str, Any]:
+        """Builds and returns the primary key and the given attributes."""
+        obj = cls.build_object(instance)
+        return {key: obj[key] for key in (cls.PRIMARY_KEY, *attributes) if key in obj}
+
+    @classmethod
+    def index_queryset(cls) -> QuerySet[M]:
+        """
+        Returns the base queryset used to fetch the instances to index.
+
+        Overridden `values()` rows must contain the primary key (as `pk` or its name).
+        """
+        queryset = cls.MODEL_CLASS._default_manager.all()
+        if len(cls.INDEX_SELECT_RELATED) > 0:
+            queryset = queryset.select_related(*cls.INDEX_SELECT_RELATED)
+        if len(cls.INDEX_PREFETCH_RELATED) > 0:
+            queryset = queryset.prefetch_related(*cls.INDEX_PREFETCH_RELATED)
+        if len(cls.INDEX_ONLY_FIELDS) > 0:
+            queryset = queryset.only(*cls.INDEX_ONLY_FIELDS)
+        return queryset
+
+    # --------------------------------------------------
+    # Sharding
+    # --------------------------------------------------
+    @classmethod
+    def shard_key(cls, instance: Union[M, Dict[str, Any]]) -> Optional[str]:
+        """Returns the shard of the instance, or None to not index it."""
+        value = cls._row_value(instance, cls._shard_field())
+        return None if value is None else str(value)
+
+    @classmethod
+    def shard_query(cls, shard: str) -> Q:
+        """Returns the query selecting the instances of the shard."""
+        return Q(**{cls._shard_field(): shard})
+
+    @classmethod
+    def shard_index_name(cls, shard: str) -> str:
+        """Returns the name of the index of the shard."""
+        return f"{cls.index_name()}_{shard}"
+
+    @classmethod
+    def for_shard(cls, shard: str) -> Type[Self]:
+        """
+        Returns the indexer of one shard of a sharded indexer.
+
+        Shard keys must be valid index uid parts and never change for an instance.
+        """
+        cls._shard_field()
+        if cls._shard_parent is not None:
+            return cls._shard_parent.for_shard(shard)
+        if "_shard_indexers" not in cls.__dict__:
+            cls._shard_indexers = {}
+        indexer = cls._shard_indexers.get(shard)
+        if indexer is None:
+            indexer = cls._shard_indexers.setdefault(
+                shard, cls._create_shard_indexer(shard)
+            )
+        return indexer  # type: ignore
+
+    # --------------------------------------------------
+    # Private utils
+    # --------------------------------------------------
+    @classmethod
+    def _build_documents(cls, instances: Iterable[M]) -> List[Dict[str, Any]]:
+        """Builds the objects to index, with their content hash if enabled."""
+        start = monotonic()
+        objects = cls.build_objects(instances)
+        if cls.INDEX_HASH_ATTRIBUTE is not None:
+            for obj in objects:
+                obj[cls.INDEX_HASH_ATTRIBUTE] = cls._hash_object(obj)
+        cls._emit(INDEX_BUILD_SECONDS, monotonic() - start)
+        cls._emit(INDEX_BUILD_DOCUMENTS, len(objects))
+        return objects
+
+    @classmethod
+    def _build_partial_documents(
+        cls, instances: Iterable[M], attributes: Iterable[str]
+    ) -> List[Dict[str, Any]]:
+        """Builds the partial objects to index, with their content hash if enabled."""
+        if cls.INDEX_HASH_ATTRIBUTE is not None:
+            # The hash covers the whole document, which must then be built
+            keys = (cls.PRIMARY_KEY, cls.INDEX_HASH_ATTRIBUTE, *attributes)
+            return [
+                {key: obj[key] for key in keys if key in obj}
+                for obj in cls._build_documents(instances)
+            ]
+        start = monotonic()
+        objects = [
+            cls.build_partial_object(instance, attributes) for instance in instances
+        ]
+        cls._emit(INDEX_BUILD_SECONDS, monotonic() - start)
+        cls._emit(INDEX_BUILD_DOCUMENTS, len(objects))
+        return objects
+
+    @classmethod
+    def _changed_attributes(cls, fields: Iterable[str]) -> Optional[Set[str]]:
+        """Returns the affected attributes, or None if a field is not mapped."""
+        attributes: Set[str] = set()
+        for field in fields:
+            if field not in cls.INDEX_FIELD_ATTRIBUTES:
+                return None
+            attributes.update(cls.INDEX_FIELD_ATTRIBUTES[field])
+        return attributes
+
+    @classmethod
+    def _check_unsharded(cls) -> None:
+        """Raises if called on a sharded indexer, which has no index of its own."""
+        if cls.INDEX_SHARD_FIELD is not None and cls._shard is None:
+            raise ImproperlyConfigured(
+                f"{cls.__name__} is sharded: use for_shard(), or the methods "
+                "working across shards (*_by_shard and *_shards)"
+            )
+
+    @classmethod
+    def _check_hits_pagination(
+        cls, batch_size: int, params: MeilisearchSearchParameters
+    ) -> None:
+        """Validates the pagination of `iter_hits`, which pages with offset/limit."""
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        cls._check_offset_pagination("iter_hits", params)
+
+    @classmethod
+    def _check_offset_pagination(
+        cls, method: str, params: MeilisearchSearchParameters
+    ) -> None:
+        """Rejects `page`/`hitsPerPage` for methods that page with offset/limit."""
+        if "page" in params or "hitsPerPage" in params:
+            raise ValueError(f"{method} does not accept page/hitsPerPage")
+
+    @classmethod
+    def _diff_settings(cls, current: Dict[str, Any]) -> MeilisearchSettings:
+        """Returns the keys of `SETTINGS` whose values differ from the current ones."""
+        changes: Dict[str, Any] = {}
+        for key, value in cls.SETTINGS.items():
+            if value is None or not _same_setting(key, current.get(key), value):
+                changes[key] = value
+        return changes  # type: ignore
+
+    @classmethod
+    def _create_shard_indexer(cls, shard: str) -> Type[Self]:
+        index_name = cls.shard_index_name(shard)
+        index_queryset = cls.index_queryset
+        query = cls.shard_query(shard)
+
+        def _index_name(shard_cls: Type[Self]) -> str:
+            return index_name
+
+        def _index_queryset(shard_cls: Type[Self]) -> QuerySet[M]:
+            return index_queryset().filter(query)
+
+        return type(
+            f"{cls.__name__}_{shard}",
+            (cls,),
+            {
+                "__module__": cls.__module__,
+                "_shard": shard,
+                "_shard_parent": cls,
+                "index_name": classmethod(_index_name),
+                "index_queryset": classmethod(_index_queryset),
+            },
+        )
+
+    @classmethod
+    def _shard_field(cls) -> str:
+        if cls.INDEX_SHARD_FIELD is None:
+            raise ImproperlyConfigured(
+                f"{cls.__name__}.INDEX_SHARD_FIELD must be set to use shards"
+            )
+        return cls.INDEX_SHARD_FIELD
+
+    @classmethod
+    def _emit(cls, name: str, value: float) -> None:
+        """Sends the measurement to the `METRICS_SINK`, if any."""
+        if cls.METRICS_SINK is not None:
+            cls.METRICS_SINK.observe(name, value, {"indexer": cls.__name__})
+
+    @classmethod
+    def _group_by_shard(cls, instances: Iterable[M]) -> Dict[str, List[M]]:
+        """Groups the instances by shard, leaving out those without one."""
+        groups: Dict[str, List[M]] = {}
+        for instance in instances:
+            shard = cls.shard_key(instance)
+            if shard is not None:
+                groups.setdefault(shard, []).append(instance)
+        return groups
+
+    @classmethod
+    def _hash_object(cls, obj: Dict[str, Any]) -> str:
+        """Returns a compact hash of the object content (hash excluded)."""
+        content = {k: v for k, v in obj.items() if k != cls.INDEX_HASH_ATTRIBUTE}
+        encoded = json.dumps(
+            content, sort_keys=True, separators=(",", ":"), default=str
+        ).encode()
+        return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+    @classmethod
+    def _hits_queryset(
+        cls, queryset: Optional[QuerySet[M]], hits: List[Dict[str, Any]]
+    ) -> QuerySet[M]:
+        """Returns the instances of the search hits, ordered by rank."""
+        if queryset is None:
+            queryset = cls.MODEL_CLASS._default_manager.all()
+        ids = [hit[cls.PRIMARY_KEY] for hit in hits]
+        if len(ids) == 0:
+            return queryset.none()
+        rank = Case(
+            *(When(**{cls.PRIMARY_KEY: id_}, then=i) for i, id_ in enumerate(ids))
+        )
+        return queryset.filter(**{f"{cls.PRIMARY_KEY}__in": ids}).order_by(rank)
+
+    @classmethod
+    def _ids_queryset(cls, query: Q) -> QuerySet:
+        """Returns the `(pk, PRIMARY_KEY)` pairs matching the query, by primary key."""
+        return (
+            cls.MODEL_CLASS._default_manager.filter(query)
+            .order_by("pk")
+            .values_list("pk", cls.PRIMARY_KEY)
+        )
+
+    @classmethod
+    def _row_value(cls, row: Union[M, Dict[str, Any]], field: str) -> Any:
+        """Returns a field value from either a model instance or a `values()` row."""
+        if not isinstance(row, dict):
+            return getattr(row, field)
+        if field == "pk" and "pk" not in row:
+            field = cls.MODEL_CLASS._meta.pk.attname
+        return row[field]
+
+
+class MeilisearchModelIndexer(BaseMeilisearchModelIndexer[M]):
+    _search_cache: LRUCache
+    _search_cache_stats: Dict[str, int]
+    _search_generation: int
+    _search_write_task: int
+    _search_finished_task: int
+
+    INDEX_UPLOAD_WORKERS = 0
+    INDEX_WORKERS = 0
+    INDEX_MAX_PAYLOAD_SIZE: Optional[int] = None
+    INDEX_GZIP_LEVEL: Optional[int] = None
+    INDEX_MAX_IN_FLIGHT: Optional[int] = None
+    INDEX_MAX_QUEUED_TASKS: Optional[int] = None
+    INDEX_WATERMARK_FIELD: Optional[str] = None
+    INDEX_STATE_CACHE = "default"
+    SEARCH_CACHE_SIZE = 0
+    SEARCH_CACHE_TTL = 60.0
+    SEARCH_CACHE_ALIAS: Optional[str] = None
+
     # --------------------------------------------------
     # Index management
     # --------------------------------------------------
     @classmethod
     def index_exists(cls) -> bool:
         """Returns True if the index exists."""
-        try:
-            cls.meilisearch_client().get_index(cls.index_name())
-            return True
-        except Exception:  # noqa
-            return False
+        cls._check_unsharded()
+        return cls._index_exists(cls.index_name())
 
     @classmethod
-    def maybe_create_index(cls) -> None:
+    def maybe_create_index(cls) -> List[TaskInfo]:
         """Creates the index if it doesn't exist."""
         client = cls.meilisearch_client()
+        tasks = []
         if not cls.index_exists():
-            client.create_index(cls.index_name(), {"primaryKey": cls.PRIMARY_KEY})
-        cls.update_settings()
+            tasks.append(
+                client.create_index(cls.index_name(), {"primaryKey": cls.PRIMARY_KEY})
+            )
+        settings_task = cls.update_settings()
+        if settings_task is not None:
+            tasks.append(settings_task)
+        return tasks
 
     @classmethod
-    def update_settings(cls) -> None:
-        """Updates the index settings."""
-        cls.meilisearch_client().index(cls.index_name()).update_settings(cls.SETTINGS)
+    def update_settings(
+        cls, wait: bool = False, timeout: Optional[float] = None
+    ) -> Optional[TaskInfo]:
+        """
+        Updates the index settings that differ from the current ones.
+
+        Returns None if nothing changed, and with `wait` also waits for the task.
+        """
+        cls._check_unsharded()
+        index = cls.meilisearch_client().index(cls.index_name())
+        try:
+            current = index.get_settings()
+        except MeilisearchApiError as error:
+            if error.code != "index_not_found":
+                raise
+            current = {}
+        changes = cls._diff_settings(current)
+        if len(changes) == 0:
+            return None
+        with cls._invalidating_search_cache() as sent:
+            task = index.update_settings(changes)  # type: ignore
+            sent.append(task)
+        if wait:
+            cls.wait_for_tasks([task], timeout)
+        return task
 
     # --------------------------------------------------
     # Indexing
     # --------------------------------------------------
     @classmethod
-    def index(cls, instance: M) -> None:
+    def index(cls, instance: M) -> TaskInfo:
         """Indexes the model instance."""
-        cls.index_multiple([instance])
+        return cls.index_multiple([instance])
 
     @classmethod
-    def index_multiple(cls, instances: Union[List[M], QuerySet[M]]) -> None:
+    def index_multiple(cls, instances: Union[List[M], QuerySet[M]]) -> TaskInfo:
         """Indexes multiple model instances."""
-        objects = [cls.build_object(instance) for instance in instances]
-        cls.meilisearch_client().index(cls.index_name()).add_documents(objects)
+        cls._check_unsharded()
+        objects = cls._build_documents(instances)
+        return cls._add_documents(cls.index_name(), objects)
+
+    @classmethod
+    def update(cls, instance: M, fields: Iterable[str]) -> Optional[TaskInfo]:
+        """Partially updates the indexed instance after a change of `fields`."""
+        return cls.update_multiple([instance], fields)
 
     @classmethod
-    def index_from_query(cls, query: Q) -> None:
+    def update_multiple(
+        cls, instances: Union[List[M], QuerySet[M]], fields: Iterable[str]
+    ) -> Optional[TaskInfo]:
+        """
+        Partially updates multiple indexed instances after a change of `fields`.
+
+        The documents must already be indexed. Returns None if no attribute is affected.
+        """
+        cls._check_unsharded()
+        attributes = cls._changed_attributes(fields)
+        if attributes is None:
+            return cls.index_multiple(instances)
+        if len(attributes) == 0:
+            return None
+        objects = cls._build_partial_documents(instances, attributes)
+        return cls._update_documents(cls.index_name(), objects)
+
+    @classmethod
+    def index_from_query(
+        cls,
+        query: Q,
+        batch_size: Optional[int] = None,
+        upload_workers: Optional[int] = None,
+        workers: Optional[int] = None,
+    ) -> List[TaskInfo]:
         """Indexes all the instances matching the query."""
-        cls._index_from_query(query, cls.index_name())
+        cls._check_unsharded()
+        return cls._index_from_query(
+            query, cls.index_name(), batch_size, upload_workers, workers
+        )
 
     @classmethod
-    def index_all(cls) -> None:
+    def index_all(
+        cls,
+        batch_size: Optional[int] = None,
+        upload_workers: Optional[int] = None,
+        workers: Optional[int] = None,
+    ) -> List[TaskInfo]:
         """Indexes all the instances of the model."""
-        cls._index_from_query(Q(), cls.index_name())
+        cls._check_unsharded()
+        return cls._index_from_query(
+            Q(), cls.index_name(), batch_size, upload_workers, workers
+        )
 
     @classmethod
-    def index_all_atomically(cls) -> None:
-        """Indexes all the instances of the model atomically."""
+    def index_all_atomically(
+        cls,
+        batch_size: Optional[int] = None,
+        upload_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        workers: Optional[int] = None,
+        resumable: bool = False,
+    ) -> List[TaskInfo]:
+        """
+        Indexes all the instances of the model atomically.
+
+        Returns the swap and cleanup tasks. With `resumable`, calling it again after a
+        failure continues from the last checkpoint: `INDEX_STATE_CACHE` must then be a
+        persistent cache, and `upload_workers` and `workers` are ignored.
+        """
+        cls._check_unsharded()
         client = cls.meilisearch_client()
-        # Create temporary index
         tmp_index_name = f"{cls.index_name()}_tmp"
-        client.create_index(tmp_index_name, {"primaryKey": cls.PRIMARY_KEY})
-        client.index(tmp_index_name).update_settings(cls.SETTINGS)
-        # Index all objects on it
-        cls._index_from_query(Q(), tmp_index_name)
+        if resumable:
+            cls._check_persistent_state_cache()
+            cls._index_all_resumably(tmp_index_name, batch_size, timeout)
+        else:
+            cls._delete_state("reindex_checkpoint")
+            tasks = cls._create_tmp_index(tmp_index_name)
+            tasks.extend(
+                cls._index_from_query(
+                    Q(), tmp_index_name, batch_size, upload_workers, workers
+                )
+            )
+            cls.wait_for_tasks(tasks, timeout)
         # Swap indexes and cleanup
-        client.swap_indexes([{"indexes": [cls.index_name(), tmp_index_name]}])
-        client.delete_index(tmp_index_name)
+        with cls._invalidating_search_cache() as sent:
+            swap_task = client.swap_indexes(
+                [{"indexes": [cls.index_name(), tmp_index_name]}]
+            )
+            sent.append(swap_task)
+        return [swap_task, client.delete_index(tmp_index_name)]
+
+    @classmethod
+    def index_changes(
+        cls, batch_size: Optional[int] = None, timeout: Optional[float] = None
+    ) -> List[TaskInfo]:
+        """
+        Indexes the instances that changed since the last call (delta sync).
+
+        Requires `INDEX_WATERMARK_FIELD` and a persistent `INDEX_STATE_CACHE`. With
+        `INDEX_HASH_ATTRIBUTE`, `PRIMARY_KEY` must be a filterable attribute.
+        """
+        cls._check_unsharded()
+        field = cls.INDEX_WATERMARK_FIELD
+        if field is None:
+            raise ImproperlyConfigured(
+                f"{cls.__name__}.INDEX_WATERMARK_FIELD must be set to index changes"
+            )
+        cls._check_persistent_state_cache()
+        watermark = cls._get_state("watermark")
+        query = Q() if watermark is None else Q(**{f"{field}__gte": watermark})
+        new_watermark = (
+            cls.index_queryset().filter(query).aggregate(value=Max(field))["value"]
+        )
+        if new_watermark is None:
+            return []
+        index_name = cls.index_name()
+        tasks = []
+        for instances in cls._iter_batches(query, batch_size):
+            objects = cls._build_documents(instances)
+            if cls.INDEX_HASH_ATTRIBUTE is not None:
+                objects = cls._exclude_unchanged(index_name, objects)
+            if len(objects) > 0:
+                tasks.append(cls._add_documents(index_name, objects))
+        cls.wait_for_tasks(tasks, timeout)
+        cls._set_state("watermark", new_watermark)
+        return tasks
 
     @classmethod
-    def unindex(cls, id_: int) -> None:
+    def reconcile(cls, batch_size: Optional[int] = None) -> ReconcileReport:
+        """
+        Compares the index with the database and only sends the difference.
+
+        `PRIMARY_KEY` must be a filterable attribute.
+        """
+        cls._check_unsharded()
+        batch_size = batch_size or cls.INDEX_BATCH_SIZE
+        index_name = cls.index_name()
+        orphaned_ids: List[Any] = []
+        for ids in cls._iter_indexed_ids(index_name, batch_size):
+            existing_ids = {
+                str(id_)
+                for id_ in cls.index_queryset()
+                .filter(**{f"{cls.PRIMARY_KEY}__in": ids})
+                .values_list(cls.PRIMARY_KEY, flat=True)
+            }
+            orphaned_ids.extend(id_ for id_ in ids if str(id_) not in existing_ids)
+        checked, upserted = 0, 0
+        tasks: List[TaskInfo] = []
+        for instances in cls._iter_batches(Q(), batch_size):
+            checked += len(instances)
+            if cls.INDEX_HASH_ATTRIBUTE is not None:
+                objects = cls._exclude_unchanged(
+                    index_name, cls._build_documents(instances)
+                )
+            else:
+                ids = [cls._row_value(row, cls.PRIMARY_KEY) for row in instances]
+                indexed = cls._get_indexed_documents(index_name, ids, [])
+                missing = [
+                    row for row, id_ in zip(instances, ids) if str(id_) not in indexed
+                ]
+                objects = cls._build_documents(missing)
+            if len(objects) > 0:
+                upserted += len(objects)
+                tasks.append(cls._add_documents(index_name, objects))
+        for i in range(0, len(orphaned_ids), batch_size):
+            chunk = orphaned_ids[i : i + batch_size]
+            tasks.append(cls.unindex_multiple(chunk))
+        return ReconcileReport(checked, upserted, len(orphaned_ids), tasks)
+
+    @classmethod
+    def retry_failed_batches(cls, error: MeilisearchIndexingError) -> List[TaskInfo]:
+        """Uploads again the batches that failed during a pipelined indexing."""
+        return [
+            cls._upload_batch(batch.index_name, batch.documents)
+            for batch in error.failed_batches
+        ]
+
+    @classmethod
+    def unindex(cls, id_: int) -> TaskInfo:
         """Deletes the instance from the index."""
-        cls.unindex_multiple([id_])
+        return cls.unindex_multiple([id_])
 
     @classmethod
-    def unindex_multiple(cls, ids: Union[List[int], List[str]]) -> None:
+    def unindex_multiple(cls, ids: Union[List[int], List[str]]) -> TaskInfo:
         """Deletes multiple instances from the index."""
-        cls.meilisearch_client().index(cls.index_name()).delete_documents(ids)
+        cls._check_unsharded()
+        index = cls.meilisearch_client().index(cls.index_name())
+        with cls._invalidating_search_cache() as sent:
+            task = index.delete_documents(ids)
+            sent.append(task)
+        return task
+
+    @classmethod
+    def unindex_by_filters(cls, filters: SearchFilter) -> TaskInfo:
+        """
+        Deletes the documents matching the filters from the index, in one request.
+
+        Their attributes must be filterable, and empty filters raise a `ValueError`.
+        """
+        cls._check_unsharded()
+        expression = resolve_search_filter(filters)
+        if expression is None:
+            raise ValueError("Cannot unindex by filters without any filter")
+        index = cls.meilisearch_client().index(cls.index_name())
+        with cls._invalidating_search_cache() as sent:
+            task = index.delete_documents(filter=expression)
+            sent.append(task)
+        return task
+
+    @classmethod
+    def unindex_from_query(
+        cls, query: Q, batch_size: Optional[int] = None
+    ) -> List[TaskInfo]:
+        """Deletes the instances matching the query from the index, in batches."""
+        cls._check_unsharded()
+        return [cls.unindex_multiple(ids) for ids in cls._iter_ids(query, batch_size)]
+
+    # --------------------------------------------------
+    # Auto sync
+    # --------------------------------------------------
+    @classmethod
+    def enable_auto_sync(cls) -> None:
+        """
+        Keeps the index in sync with the `MODEL_CLASS` signals.
+
+        Changes are only sent once their transaction is committed.
+        """
+        post_save.connect(
+            cls._on_model_change,
+            sender=cls.MODEL_CLASS,
+            dispatch_uid=cls._auto_sync_uid(),
+        )
+        post_delete.connect(
+            cls._on_model_change,
+            sender=cls.MODEL_CLASS,
+            dispatch_uid=cls._auto_sync_uid(),
+        )
+
+    @classmethod
+    def disable_auto_sync(cls) -> None:
+        """Disconnects the signals connected by `enable_auto_sync`."""
+        post_save.disconnect(sender=cls.MODEL_CLASS, dispatch_uid=cls._auto_sync_uid())
+        post_delete.disconnect(
+            sender=cls.MODEL_CLASS, dispatch_uid=cls._auto_sync_uid()
+        )
 
     # --------------------------------------------------
     # Searching
@@ -131,40 +751,996 @@ class MeilisearchModelIndexer(ABC, Generic[M]):
         cls,
         query: str,
         only_hits: bool = False,
-        filters: MeilisearchFilters = None,
+        filters: SearchFilter = None,
         **params: Unpack[MeilisearchSearchParameters],
     ) -> Union[MeilisearchSearchHits, MeilisearchSearchResults]:
-        filters = filters or {}
-        params["filter"] = build_search_filter(**filters) or None
-        response: MeilisearchSearchResults = (
-            cls.meilisearch_client().index(cls.index_name()).search(query, params)  # type: ignore
-        )
+        """
+        Searches the index.
+
+        `filters` is either a `MeilisearchFilters` dict or a bound compiled filter.
+        """
+        cls._check_unsharded()
+        params["filter"] = resolve_search_filter(filters)
+        response = cls._cached_search(query, params)
         if only_hits:
             return {"hits": response["hits"]}
         return response
 
+    @classmethod
+    def search_many(
+        cls,
+        queries: List[Union[MeilisearchQuery, IndexerQuery]],
+        only_hits: bool = False,
+    ) -> List[Union[MeilisearchSearchHits, MeilisearchSearchResults]]:
+        """
+        Runs several searches in a single multi-search request.
+
+        Each query is a `(query, filters, params)` tuple, or an
+        `(indexer_class, query, filters, params)` tuple to target another index.
+        """
+        requests = []
+        for entry in queries:
+            indexer = cls if len(entry) == 3 else entry[0]
+            indexer._check_unsharded()
+            query, filters, params = entry[-3:]
+            request: Dict[str, Any] = {"indexUid": indexer.index_name(), "q": query}
+            request.update(params or {})
+            request["filter"] = resolve_search_filter(filters)
+            requests.append(request)
+        start = monotonic()
+        response = cls.meilisearch_client().multi_search(requests)
+        results = response["results"]
+        cls._emit(SEARCH_CLIENT_SECONDS, monotonic() - start)
+        for result in results:
+            cls._emit(SEARCH_SERVER_SECONDS, result.get("processingTimeMs", 0) / 1000)
+        if only_hits:
+            return [{"hits": result["hits"]} for result in results]
+        return results  # type: ignore
+
+    @classmethod
+    def iter_hits(
+        cls,
+        query: str = "",
+        filters: SearchFilter = None,
+        batch_size: int = 1000,
+        **params: Unpack[MeilisearchSearchParameters],
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yields every hit of the search, fetching `batch_size` of them at a time.
+
+        Documents changed during the iteration may be skipped or yielded twice.
+        Ranked searches are capped by `pagination.maxTotalHits`, and
+        `page`/`hitsPerPage` raise a `ValueError`.
+        """
+        cls._check_unsharded()
+        cls._check_hits_pagination(batch_size, params)
+        expression = resolve_search_filter(filters)
+        fields = params.get("attributesToRetrieve")
+        if query == "" and params.keys() <= {"attributesToRetrieve"}:
+            index = cls.meilisearch_client().index(cls.index_name())
+            parameters: Dict[str, Any] = {"limit": batch_size}
+            if expression is not None:
+                parameters["filter"] = expression
+            if fields is not None:
+                parameters["fields"] = fields
+            offset = 0
+            while True:
+                documents = index.get_documents({**parameters, "offset": offset})
+                yield from map(dict, documents.results)
+                if len(documents.results) < batch_size:
+                    return
+                offset += batch_size
+        params["filter"] = expression
+        params["limit"] = batch_size
+        offset = params.pop("offset", None) or 0
+        while True:
+            params["offset"] = offset
+            hits = cls._search(query, params)["hits"]
+            yield from hits
+            if len(hits) < batch_size:
+                return
+            offset += batch_size
+
+    @classmethod
+    def search_queryset(
+        cls,
+        query: str,
+        filters: SearchFilter = None,
+        queryset: Optional[QuerySet[M]] = None,
+        **params: Unpack[MeilisearchSearchParameters],
+    ) -> Tuple[QuerySet[M], MeilisearchSearchResults]:
+        """
+        Searches the index and returns the queryset of the hits with the results.
+
+        Hits missing from `queryset` (defaults to all the instances) are left out.
+        """
+        params.setdefault("attributesToRetrieve", [cls.PRIMARY_KEY])
+        results: MeilisearchSearchResults = cls.search(  # type: ignore
+            query, filters=filters, **params
+        )
+        return cls._hits_queryset(queryset, results["hits"]), results
+
+    @classmethod
+    def search_instances(
+        cls,
+        query: str,
+        filters: SearchFilter = None,
+        queryset: Optional[QuerySet[M]] = None,
+        **params: Unpack[MeilisearchSearchParameters],
+    ) -> Tuple[List[M], MeilisearchSearchResults]:
+        """Same as `search_queryset`, but returns the list of instances."""
+        instances, results = cls.search_queryset(query, filters, queryset, **params)
+        return list(instances), results
+
+    @classmethod
+    def invalidate_search_cache(cls) -> None:
+        """Bumps the cache generation so that no cached result is served again."""
+        if cls.SEARCH_CACHE_ALIAS is not None:
+            cache = caches[cls.SEARCH_CACHE_ALIAS]
+            key = cls._state_key("search_generation")
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, 1, None)
+        else:
+            cls._search_generation = cls._get_search_generation() + 1
+        if "_search_cache" in cls.__dict__:
+            cls._search_cache.clear()
+
+    @classmethod
+    def search_cache_info(cls) -> Dict[str, int]:
+        """Returns the hit/miss counters and current size of the search cache."""
+        stats = cls.__dict__.get("_search_cache_stats", {})
+        return {
+            "hits": stats.get("hits", 0),
+            "misses": stats.get("misses", 0),
+            "size": len(cls.__dict__.get("_search_cache", ())),
+        }
+
     # --------------------------------------------------
-    # Utils
+    # Sharding
     # --------------------------------------------------
     @classmethod
-    def meilisearch_client(cls) -> Client:
-        """Returns the Meilisearch client. Cached property."""
-        if cls._meilisearch_client is None:
-            cls._meilisearch_client = Client(
-                settings.MEILISEARCH_HOST, settings.MEILISEARCH_API_KEY
+    def shard_keys(cls) -> List[str]:
+        """Returns the keys of every shard, from the `index_queryset` instances."""
+        values = (
+            cls.index_queryset()
+            .order_by()
+            .values_list(cls._shard_field(), flat=True)
+            .distinct()
+        )
+        return sorted(str(value) for value in values if value is not None)
+
+    @classmethod
+    def index_by_shard(cls, instances: Iterable[M]) -> List[TaskInfo]:
+        """Indexes multiple model instances, each on the index of its shard."""
+        return [
+            cls.for_shard(shard).index_multiple(group)
+            for shard, group in cls._group_by_shard(instances).items()
+        ]
+
+    @classmethod
+    def update_by_shard(
+        cls, instances: Iterable[M], fields: Iterable[str]
+    ) -> List[TaskInfo]:
+        """Partially updates multiple model instances, each on the index of its shard."""
+        fields = list(fields)
+        tasks = [
+            cls.for_shard(shard).update_multiple(group, fields)
+            for shard, group in cls._group_by_shard(instances).items()
+        ]
+        return [task for task in tasks if task is not None]
+
+    @classmethod
+    def unindex_by_shard(cls, instances: Iterable[M]) -> List[TaskInfo]:
+        """Deletes multiple model instances, each from the index of its shard."""
+        return [
+            cls.for_shard(shard).unindex_multiple(
+                [cls._row_value(instance, cls.PRIMARY_KEY) for instance in group]
             )
-        return cls._meilisearch_client
+            for shard, group in cls._group_by_shard(instances).items()
+        ]
+
+    @classmethod
+    def index_shards_atomically(
+        cls,
+        shards: Optional[Iterable[str]] = None,
+        batch_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> List[TaskInfo]:
+        """Rebuilds the index of each shard (defaults to all) atomically."""
+        tasks = []
+        for shard in cls.shard_keys() if shards is None else shards:
+            indexer = cls.for_shard(shard)
+            indexer.wait_for_tasks(indexer.maybe_create_index(), timeout)
+            tasks.extend(indexer.index_all_atomically(batch_size, timeout=timeout))
+        return tasks
+
+    @classmethod
+    def search_shards(
+        cls,
+        query: str,
+        shards: Optional[Iterable[str]] = None,
+        filters: SearchFilter = None,
+        **params: Unpack[MeilisearchSearchParameters],
+    ) -> MeilisearchSearchResults:
+        """
+        Searches several shards (defaults to all) in one multi-search request.
+
+        `sort` only orders the hits within each shard, and
+        `page`/`hitsPerPage` raise a `ValueError`.
+        """
+        cls._check_offset_pagination("search_shards", params)
+        offset = params.pop("offset", None) or 0
+        limit = params.pop("limit", None)
+        limit = 20 if limit is None else limit
+        params["offset"], params["limit"] = 0, offset + limit
+        params["showRankingScore"] = True
+        queries: List[Union[MeilisearchQuery, IndexerQuery]] = [
+            (cls.for_shard(shard), query, filters, params)
+            for shard in (cls.shard_keys() if shards is None else shards)
+        ]
+        results: List[MeilisearchSearchResults] = (
+            cls.search_many(queries) if len(queries) > 0 else []  # type: ignore
+        )
+        hits = sorted(
+            chain.from_iterable(result["hits"] for result in results),
+            key=lambda hit: hit["_rankingScore"],
+            reverse=True,
+        )
+        return {
+            "hits": hits[offset : offset + limit],
+            "query": query,
+            "offset": offset,
+            "limit": limit,
+            "estimatedTotalHits": sum(
+                result.get("estimatedTotalHits", 0) for result in results
+            ),
+            "processingTimeMs": max(
+                (result.get("processingTimeMs", 0) for result in results), default=0
+            ),
+        }
+
+    # --------------------------------------------------
+    # Tasks
+    # --------------------------------------------------
+    @classmethod
+    def wait_for_tasks(
+        cls, tasks: Iterable[TaskInfo], timeout: Optional[float] = None
+    ) -> List[Task]:
+        """
+        Waits for all the tasks to be processed and returns them.
+
+        Raises a `MeilisearchTimeoutError` after `timeout` seconds (defaults to
+        `TASKS_TIMEOUT`) and a `MeilisearchTaskError` if any task did not succeed.
+        """
+        timeout = timeout if timeout is not None else cls.TASKS_TIMEOUT
+        deadline = monotonic() + timeout
+        client = cls.meilisearch_client()
+        pending = list(dict.fromkeys(task.task_uid for task in tasks))
+        finished: Dict[int, Task] = {}
+        interval = cls.TASKS_POLL_INTERVAL
+        while len(pending) > 0:
+            for i in range(0, len(pending), cls.TASKS_POLL_SIZE):
+                uids = pending[i : i + cls.TASKS_POLL_SIZE]
+                results = client.get_tasks(
+                    {"uids": [str(uid) for uid in uids], "limit": len(uids)}
+                ).results
+                for task in results:
+                    if task.status not in ("enqueued", "processing"):
+                        finished[task.uid] = task
+            pending = [uid for uid in pending if uid not in finished]
+            if len(pending) == 0:
+                break
+            if monotonic() >= deadline:
+                raise MeilisearchTimeoutError(
+                    f"Timeout of {timeout}s exceeded while waiting for tasks {pending}"
+                )
+            sleep(min(interval, max(deadline - monotonic(), 0)))
+            interval = min(interval * 2, cls.TASKS_POLL_MAX_INTERVAL)
+        failed_tasks = [
+            task for task in finished.values() if task.status != "succeeded"
+        ]
+        # Results cached while the tasks were processing might be stale
+        cls.invalidate_search_cache()
+        if len(failed_tasks) > 0:
+            raise MeilisearchTaskError(failed_tasks)
+        return list(finished.values())
+
+    # --------------------------------------------------
+    # Utils
+    # --------------------------------------------------
+    @classmethod
+    def meilisearch_client(cls) -> PooledClient:
+        """Returns the Meilisearch client shared by all the indexers."""
+        return get_meilisearch_client(
+            settings.MEILISEARCH_HOST,
+            settings.MEILISEARCH_API_KEY,
+            timeout=getattr(settings, "MEILISEARCH_TIMEOUT", None),
+            pool_size=getattr(settings, "MEILISEARCH_POOL_SIZE", 10),
+            retries=getattr(settings, "MEILISEARCH_RETRIES", 0),
+        )
 
     # --------------------------------------------------
     # Private utils
     # --------------------------------------------------
     @classmethod
-    def _index_from_query(cls, query: Q, index_name: str) -> None:
+    def _exclude_unchanged(
+        cls, index_name: str, objects: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Removes the objects whose hash matches the one stored in the index."""
+        hash_attribute = cls.INDEX_HASH_ATTRIBUTE
+        ids = [obj[cls.PRIMARY_KEY] for obj in objects]
+        documents = cls._get_indexed_documents(index_name, ids, [hash_attribute])
+        return [
+            obj
+            for obj in objects
+            if documents.get(str(obj[cls.PRIMARY_KEY]), {}).get(hash_attribute)
+            != obj[hash_attribute]
+        ]
+
+    @classmethod
+    def _index_exists(cls, index_name: str) -> bool:
+        try:
+            cls.meilisearch_client().get_index(index_name)
+            return True
+        except Exception:  # noqa
+            return False
+
+    @classmethod
+    def _create_tmp_index(cls, tmp_index_name: str) -> List[TaskInfo]:
+        """Creates the temporary index, replacing the one of a previous run if any."""
+        client = cls.meilisearch_client()
+        tasks = []
+        if cls._index_exists(tmp_index_name):
+            tasks.append(client.delete_index(tmp_index_name))
+        tasks.append(
+            client.create_index(tmp_index_name, {"primaryKey": cls.PRIMARY_KEY})
+        )
+        tasks.append(client.index(tmp_index_name).update_settings(cls.SETTINGS))  # type: ignore
+        return tasks
+
+    @classmethod
+    def _index_all_resumably(
+        cls,
+        tmp_index_name: str,
+        batch_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Indexes all the instances on the temporary index, from the checkpoint."""
+        checkpoint = cls._get_state("reindex_checkpoint")
+        query = Q()
+        tasks: List[TaskInfo] = []
+        if (
+            checkpoint is not None
+            and checkpoint["index_name"] == tmp_index_name
+            and cls._index_exists(tmp_index_name)
+        ):
+            if checkpoint["last_pk"] is not None:
+                query = Q(pk__gt=checkpoint["last_pk"])
+        else:
+            tasks = cls._create_tmp_index(tmp_index_name)
+            cls._set_state(
+                "reindex_checkpoint", {"index_name": tmp_index_name, "last_pk": None}
+            )
+        last_pk = None
+        for instances in cls._iter_batches(query, batch_size):
+            task = cls._add_documents(tmp_index_name, cls._build_documents(instances))
+            cls.wait_for_tasks(tasks, timeout)
+            if last_pk is not None:
+                cls._set_state(
+                    "reindex_checkpoint",
+                    {"index_name": tmp_index_name, "last_pk": last_pk},
+                )
+            tasks, last_pk = [task], cls._row_value(instances[-1], "pk")
+        cls.wait_for_tasks(tasks, timeout)
+        # Cleared before the swap, after which the temporary index is outdated
+        cls._delete_state("reindex_checkpoint")
+
+    @classmethod
+    def _get_indexed_documents(
+        cls, index_name: str, ids: List[Any], fields: List[Any]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Fetches the given fields of the indexed documents, by stringified id."""
+        if len(ids) == 0:
+            return {}
+        filter_ids = ", ".join(escape_filter_value(id_) for id_ in ids)
+        response = (
+            cls.meilisearch_client()
+            .index(index_name)
+            .get_documents(
+                {
+                    "filter": f"{cls.PRIMARY_KEY} IN [{filter_ids}]",
+                    "fields": [cls.PRIMARY_KEY, *fields],
+                    "limit": len(ids),
+                }
+            )
+        )
+        return {
+            str(document[cls.PRIMARY_KEY]): document
+            for document in map(dict, response.results)
+        }
+
+    @classmethod
+    def _iter_indexed_ids(cls, index_name: str, page_size: int) -> Iterator[List[Any]]:
+        """Yields the ids of all the documents of the index, page by page."""
+        index = cls.meilisearch_client().index(index_name)
+        offset = 0
+        while True:
+            response = index.get_documents(
+                {"fields": [cls.PRIMARY_KEY], "offset": offset, "limit": page_size}
+            )
+            ids = [getattr(document, cls.PRIMARY_KEY) for document in response.results]
+            if len(ids) > 0:
+                yield ids
+            if len(ids) < page_size:
+                return
+            offset += page_size
+
+    @classmethod
+    def _auto_sync_uid(cls) -> str:
+        return f"jklib.meili.auto_sync.{cls.__module__}.{cls.__qualname__}"
+
+    @classmethod
+    def _pending_auto_sync(cls, using: str) -> Dict[Any, Optional[Set[str]]]:
+        """Returns the ids to sync for this thread and database."""
+        if not hasattr(_auto_sync_buffers, "ids"):
+            _auto_sync_buffers.ids = {}
+        return _auto_sync_buffers.ids.setdefault((cls, using), {})
+
+    @classmethod
+    def _on_model_change(
+        cls,
+        instance: M,
+        using: str,
+        update_fields: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Buffers the instance id and schedules a flush after the commit."""
+        if cls.INDEX_SHARD_FIELD is not None and cls._shard is None:
+            shard = cls.shard_key(instance)
+            if shard is not None:
+                shard_indexer = cls.for_shard(shard)
+                shard_indexer._on_model_change(instance, using, update_fields, **kwargs)
+            return
+        attributes = None
+        if update_fields is not None:
+            attributes = cls._changed_attributes(update_fields)
+            if attributes is not None and len(attributes) == 0:
+                return
+        pending = cls._pending_auto_sync(using)
+        id_ = getattr(instance, cls.PRIMARY_KEY)
+        if id_ in pending:
+            previous = pending[id_]
+            if previous is None or attributes is None:
+                attributes = None
+            else:
+                attributes = previous | attributes
+        pending[id_] = attributes
+        transaction.on_commit(
+            partial(cls._flush_auto_sync, using), using=using, robust=True
+        )
+
+    @classmethod
+    def _flush_auto_sync(cls, using: str) -> None:
+        """Indexes the buffered instances that still exist and unindexes the others."""
+        pending = cls._pending_auto_sync(using)
+        if len(pending) == 0:
+            return
+        groups: Dict[Optional[FrozenSet[str]], List[Any]] = {}
+        for id_, attributes in pending.items():
+            key = None if attributes is None else frozenset(attributes)
+            groups.setdefault(key, []).append(id_)
+        pending.clear()
+        queryset = cls.index_queryset().using(using)
+        for changed, ids in groups.items():
+            for i in range(0, len(ids), cls.INDEX_BATCH_SIZE):
+                chunk = ids[i : i + cls.INDEX_BATCH_SIZE]
+                instances = list(queryset.filter(**{f"{cls.PRIMARY_KEY}__in": chunk}))
+                if len(instances) > 0 and changed is None:
+                    cls.index_multiple(instances)
+                elif len(instances) > 0:
+                    objects = cls._build_partial_documents(instances, changed)
+                    cls._update_documents(cls.index_name(), objects)
+                found_ids = {cls._row_value(row, cls.PRIMARY_KEY) for row in instances}
+                missing_ids = [id_ for id_ in chunk if id_ not in found_ids]
+                if len(missing_ids) > 0:
+                    cls.unindex_multiple(missing_ids)
+
+    @classmethod
+    def _cached_search(
+        cls, query: str, params: MeilisearchSearchParameters
+    ) -> MeilisearchSearchResults:
+        """Runs the search, going through the search cache if it is enabled."""
+        if cls.SEARCH_CACHE_SIZE <= 0 and cls.SEARCH_CACHE_ALIAS is None:
+            return cls._search(query, params)
+        if "_search_cache" not in cls.__dict__:
+            cls._search_cache = LRUCache(cls.SEARCH_CACHE_SIZE, cls.SEARCH_CACHE_TTL)
+            cls._search_cache_stats = {"hits": 0, "misses": 0}
+        payload = [cls.index_name(), cls._get_search_generation(), query, params]
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        key = f"jklib.meili.search.{hashlib.blake2b(encoded).hexdigest()}"
+        response = cls._search_cache.get(key)
+        if response is None and cls.SEARCH_CACHE_ALIAS is not None:
+            response = caches[cls.SEARCH_CACHE_ALIAS].get(key)
+            if response is not None and cls.SEARCH_CACHE_SIZE > 0:
+                cls._search_cache.set(key, response)
+        if response is not None:
+            cls._search_cache_stats["hits"] += 1
+            return deepcopy(response)
+        cls._search_cache_stats["misses"] += 1
+        # Checked before searching, so that a write applied meanwhile is seen
+        pending = cls._has_pending_search_write()
+        response = cls._search(query, params)
+        if pending:
+            return response
+        if cls.SEARCH_CACHE_SIZE > 0:
+            cls._search_cache.set(key, response)
+        if cls.SEARCH_CACHE_ALIAS is not None:
+            caches[cls.SEARCH_CACHE_ALIAS].set(key, response, cls.SEARCH_CACHE_TTL)
+        return deepcopy(response)
+
+    @classmethod
+    @contextmanager
+    def _invalidating_search_cache(cls) -> Iterator[List[TaskInfo]]:
+        """Yields a list for the sent write tasks, then invalidates the search cache."""
+        sent: List[TaskInfo] = []
+        try:
+            yield sent
+        finally:
+            if len(sent) > 0:
+                cls._set_search_write_task(max(task.task_uid for task in sent))
+            cls.invalidate_search_cache()
+
+    @classmethod
+    def _has_pending_search_write(cls) -> bool:
+        """Whether the last write task sent to the index may still be processing."""
+        if cls.SEARCH_CACHE_ALIAS is not None:
+            key = cls._state_key("search_write_task")
+            uid = caches[cls.SEARCH_CACHE_ALIAS].get(key)
+        else:
+            uid = cls.__dict__.get("_search_write_task")
+        if uid is None or uid <= cls.__dict__.get("_search_finished_task", -1):
+            return False
+        task = cls.meilisearch_client().get_task(uid)
+        if task.status in ("enqueued", "processing"):
+            return True
+        cls._search_finished_task = uid
+        return False
+
+    @classmethod
+    def _set_search_write_task(cls, uid: int) -> None:
+        """Records the uid of the last write task, shared through the Django cache."""
+        if cls.SEARCH_CACHE_ALIAS is not None:
+            cache = caches[cls.SEARCH_CACHE_ALIAS]
+            key = cls._state_key("search_write_task")
+            current = cache.get(key)
+            if current is None or uid > current:
+                cache.set(key, uid, None)
+        elif uid > cls.__dict__.get("_search_write_task", -1):
+            cls._search_write_task = uid
+
+    @classmethod
+    def _search(
+        cls, query: str, params: MeilisearchSearchParameters
+    ) -> MeilisearchSearchResults:
+        """Sends the search request, measuring the client and server durations."""
+        start = monotonic()
+        index = cls.meilisearch_client().index(cls.index_name())
+        response = index.search(query, params)
+        cls._emit(SEARCH_CLIENT_SECONDS, monotonic() - start)
+        cls._emit(SEARCH_SERVER_SECONDS, response.get("processingTimeMs", 0) / 1000)
+        return response  # type: ignore
+
+    @classmethod
+    def _get_search_generation(cls) -> int:
+        """Returns the search cache generation, shared through the Django cache."""
+        if cls.SEARCH_CACHE_ALIAS is not None:
+            key = cls._state_key("search_generation")
+            return caches[cls.SEARCH_CACHE_ALIAS].get(key, 0)
+        return cls.__dict__.get("_search_generation", 0)
+
+    @classmethod
+    def _check_persistent_state_cache(cls) -> None:
+        """Raises an `ImproperlyConfigured` if the state cache is not persistent."""
+        cache = caches[cls.INDEX_STATE_CACHE]
+        if isinstance(cache, (DummyCache, LocMemCache)):
+            raise ImproperlyConfigured(
+                f"{cls.__name__}.INDEX_STATE_CACHE must be a persistent cache, "
+                f"not a {type(cache).__name__}"
+            )
+
+    @classmethod
+    def _get_state(cls, key: str) -> Any:
+        """Returns a value persisted in the `INDEX_STATE_CACHE` cache."""
+        return caches[cls.INDEX_STATE_CACHE].get(cls._state_key(key))
+
+    @classmethod
+    def _delete_state(cls, key: str) -> None:
+        """Removes a value persisted in the `INDEX_STATE_CACHE` cache."""
+        caches[cls.INDEX_STATE_CACHE].delete(cls._state_key(key))
+
+    @classmethod
+    def _set_state(cls, key: str, value: Any) -> None:
+        """Persists a value in the `INDEX_STATE_CACHE` cache, without expiry."""
+        caches[cls.INDEX_STATE_CACHE].set(cls._state_key(key), value, None)
+
+    @classmethod
+    def _state_key(cls, key: str) -> str:
+        return f"jklib.meili.{cls.index_name()}.{key}"
+
+    @classmethod
+    def _add_documents(cls, index_name: str, objects: List[Dict[str, Any]]) -> TaskInfo:
+        """Uploads the objects to the given index."""
+        index = cls.meilisearch_client().index(index_name)
+        payload = json.dumps(objects).encode()
+        start = monotonic()
+        with cls._invalidating_search_cache() as sent:
+            task = index.add_documents_raw(payload, content_type="application/json")
+            sent.append(task)
+        cls._emit(INDEX_UPLOAD_SECONDS, monotonic() - start)
+        cls._emit(INDEX_UPLOAD_BYTES, len(payload))
+        return task
+
+    @classmethod
+    def _update_documents(
+        cls, index_name: str, objects: List[Dict[str, Any]]
+    ) -> TaskInfo:
+        """Uploads the partial objects to the given index, merging their attributes."""
+        index = cls.meilisearch_client().index(index_name)
+        payload = json.dumps(objects).encode()
+        start = monotonic()
+        with cls._invalidating_search_cache() as sent:
+            task = index.update_documents_raw(
+                payload,  # type: ignore
+                content_type="application/json",
+            )
+            sent.append(task)
+        cls._emit(INDEX_UPLOAD_SECONDS, monotonic() - start)
+        cls._emit(INDEX_UPLOAD_BYTES, len(payload))
+        return task
+
+    @classmethod
+    def _add_documents_ndjson(cls, index_name: str, payload: bytes) -> TaskInfo:
+        """Uploads the NDJSON payload to the given index, gzipped if enabled."""
+        client = cls.meilisearch_client()
+        if cls.INDEX_GZIP_LEVEL is not None:
+            payload = gzip.compress(payload, compresslevel=cls.INDEX_GZIP_LEVEL)
+        start = monotonic()
+        with cls._invalidating_search_cache() as sent:
+            if cls.INDEX_GZIP_LEVEL is None:
+                task = client.index(index_name).add_documents_raw(
+                    payload, content_type="application/x-ndjson"
+                )
+            else:
+                # The SDK has no public way to set the `Content-Encoding` header
+                config = client.config
+                response = client.http_requests({"Content-Encoding": "gzip"}).post(
+                    f"{config.paths.index}/{index_name}/{config.paths.document}",
+                    payload,
+                    "application/x-ndjson",
+                )
+                task = TaskInfo(**response)
+            sent.append(task)
+        cls._emit(INDEX_UPLOAD_SECONDS, monotonic() - start)
+        cls._emit(INDEX_UPLOAD_BYTES, len(payload))
+        return task
+
+    @classmethod
+    def _upload_batch(
+        cls, index_name: str, batch: MeilisearchDocumentsBatch
+    ) -> TaskInfo:
+        """Uploads either a list of documents or an NDJSON payload."""
+        if isinstance(batch, bytes):
+            return cls._add_documents_ndjson(index_name, batch)
+        return cls._add_documents(index_name, batch)
+
+    @classmethod
+    def _index_from_query(
+        cls,
+        query: Q,
+        index_name: str,
+        batch_size: Optional[int] = None,
+        upload_workers: Optional[int] = None,
+        workers: Optional[int] = None,
+    ) -> List[TaskInfo]:
         """Indexes all the objects matching the query on the given index."""
-        queryset = cls.MODEL_CLASS.objects.filter(query)
-        paginator = Paginator(queryset, 500)
-        for page in paginator.page_range:
-            instances = paginator.page(page).object_list
-            objects = [cls.build_object(instance) for instance in instances]
-            if len(objects) > 0:
-                cls.meilisearch_client().index(index_name).add_documents(objects)
+        workers = workers or cls.INDEX_WORKERS
+        if workers > 1:
+            return cls._index_from_query_sharded(
+                query, index_name, batch_size, upload_workers, workers
+            )
+        upload_workers = upload_workers or cls.INDEX_UPLOAD_WORKERS
+        start = monotonic()
+        documents = 0
+        throttled = 0.0
+
+        def _count(
+            batches: Iterable[MeilisearchDocumentsBatch],
+        ) -> Iterator[MeilisearchDocumentsBatch]:
+            nonlocal documents, throttled
+            for batch in batches:
+                if isinstance(batch, bytes):
+                    documents += batch.count(b"\n")
+                else:
+                    documents += len(batch)
+                throttled += cls._wait_for_task_queue(index_name)
+                yield batch
+
+        batches = _count(cls._iter_upload_batches(query, batch_size))
+        if upload_workers > 0:
+            tasks = cls._index_from_query_pipelined(batches, index_name, upload_workers)
+        else:
+            tasks = [cls._upload_batch(index_name, batch) for batch in batches]
+        elapsed = monotonic() - start
+        # The monotonic clock may not have ticked (its resolution can be ~15ms)
+        if cls.METRICS_SINK is not None and elapsed > 0:
+            cls._emit(INDEX_DOCUMENTS_PER_SECOND, documents / elapsed)
+        if cls.INDEX_MAX_QUEUED_TASKS is not None:
+            cls._emit(INDEX_THROTTLED_SECONDS, throttled)
+        return tasks
+
+    @classmethod
+    def _index_from_query_pipelined(
+        cls,
+        batches: Iterable[MeilisearchDocumentsBatch],
+        index_name: str,
+        upload_workers: int,
+    ) -> List[TaskInfo]:
+        """Builds the batches while a pool of workers uploads the previous ones."""
+        max_in_flight = cls.INDEX_MAX_IN_FLIGHT or 2 * upload_workers
+        in_flight: Dict[Future, Tuple[int, MeilisearchDocumentsBatch]] = {}
+        failed_batches: List[FailedBatch] = []
+        tasks: Dict[int, TaskInfo] = {}
+
+        def _collect(futures: Iterable[Future]) -> None:
+            for future in futures:
+                number, objects = in_flight.pop(future)
+                error = future.exception()
+                if error is not None:
+                    failed_batches.append(
+                        FailedBatch(index_name, number, objects, error)
+                    )
+                else:
+                    tasks[number] = future.result()
+
+        with ThreadPoolExecutor(max_workers=upload_workers) as executor:
+            for number, batch in enumerate(batches):
+                if len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    _collect(done)
+                future = executor.submit(cls._upload_batch, index_name, batch)
+                in_flight[future] = (number, batch)
+            _collect(wait(in_flight).done)
+        if len(failed_batches) > 0:
+            failed_batches.sort(key=lambda batch: batch.number)
+            raise MeilisearchIndexingError(failed_batches)
+        return [tasks[number] for number in sorted(tasks)]
+
+    @classmethod
+    def _index_from_query_sharded(
+        cls,
+        query: Q,
+        index_name: str,
+        batch_size: Optional[int],
+        upload_workers: Optional[int],
+        workers: int,
+    ) -> List[TaskInfo]:
+        """
+        Builds and uploads the batches in `workers` processes.
+
+        The indexer must be importable from its module, and cannot run in an
+        atomic block.
+        """
+        if any(conn.in_atomic_block for conn in connections.all(initialized_only=True)):
+            raise transaction.TransactionManagementError(
+                "Indexing with worker processes cannot run in an atomic block"
+            )
+        shard_queries = cls._shard_queries(query, workers)
+        tasks: List[TaskInfo] = []
+        failed_batches: List[FailedBatch] = []
+        errors: List[BaseException] = []
+        # Forked processes must not share the parent database connections
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=len(shard_queries), initializer=_init_shard_worker
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _index_shard,
+                    cls if cls._shard is None else (cls._shard_parent, cls._shard),
+                    shard,
+                    index_name,
+                    batch_size,
+                    upload_workers,
+                )
+                for shard in shard_queries
+            ]
+            for future in futures:
+                error = future.exception()
+                if isinstance(error, MeilisearchIndexingError):
+                    failed_batches.extend(error.failed_batches)
+                elif error is not None:
+                    errors.append(error)
+                else:
+                    tasks.extend(future.result())
+        if len(errors) > 0:
+            raise errors[0]
+        if len(failed_batches) > 0:
+            raise MeilisearchIndexingError(failed_batches)
+        return tasks
+
+    @classmethod
+    def _shard_queries(cls, query: Q, shards: int) -> List[Q]:
+        """Splits the query into at most `shards` primary key ranges."""
+        pks = cls.index_queryset().filter(query).order_by("pk").values_list("pk")
+        count = pks.count()
+        if count == 0:
+            return [query]
+        bounds = sorted({pks[count * i // shards][0] for i in range(1, shards)})
+        edges = [None, *bounds, None]
+        shard_queries = []
+        for low, high in zip(edges, edges[1:]):
+            shard_query = query
+            if low is not None:
+                shard_query &= Q(pk__gte=low)
+            if high is not None:
+                shard_query &= Q(pk__lt=high)
+            shard_queries.append(shard_query)
+        return shard_queries
+
+    @classmethod
+    def _iter_upload_batches(
+        cls, query: Q, batch_size: Optional[int] = None
+    ) -> Iterator[MeilisearchDocumentsBatch]:
+        """Yields the batches of documents to upload for the query."""
+        batches = (
+            cls._build_documents(instances)
+            for instances in cls._iter_batches(query, batch_size)
+        )
+        if cls.INDEX_MAX_PAYLOAD_SIZE is None:
+            return batches
+        return cls._iter_ndjson_payloads(chain.from_iterable(batches))
+
+    @classmethod
+    def _iter_ndjson_payloads(
+        cls, objects: Iterable[Dict[str, Any]]
+    ) -> Iterator[bytes]:
+        """Encodes the objects as NDJSON payloads within `INDEX_MAX_PAYLOAD_SIZE`."""
+        max_size = cls.INDEX_MAX_PAYLOAD_SIZE or 0
+        lines: List[bytes] = []
+        size = 0
+        for obj in objects:
+            line = json.dumps(obj, separators=(",", ":")).encode() + b"\n"
+            if size + len(line) > max_size and len(lines) > 0:
+                yield b"".join(lines)
+                lines, size = [], 0
+            lines.append(line)
+            size += len(line)
+        if len(lines) > 0:
+            yield b"".join(lines)
+
+    @classmethod
+    def _iter_batches(
+        cls, query: Q, batch_size: Optional[int] = None
+    ) -> Iterator[List[M]]:
+        """Yields the instances matching the query in batches, by primary key."""
+        batch_size = batch_size or cls.INDEX_BATCH_SIZE
+        queryset = cls.index_queryset().filter(query).order_by("pk")
+        batch = cls._fetch_batch(queryset[:batch_size])
+        while len(batch) > 0:
+            yield batch
+            if len(batch) < batch_size:
+                return
+            last_pk = cls._row_value(batch[-1], "pk")
+            batch = cls._fetch_batch(queryset.filter(pk__gt=last_pk)[:batch_size])
+
+    @classmethod
+    def _iter_ids(
+        cls, query: Q, batch_size: Optional[int] = None
+    ) -> Iterator[List[Any]]:
+        """Yields the ids of the instances matching the query, like `_iter_batches`."""
+        batch_size = batch_size or cls.INDEX_BATCH_SIZE
+        queryset = cls._ids_queryset(query)
+        rows = list(queryset[:batch_size])
+        while len(rows) > 0:
+            yield [id_ for _, id_ in rows]
+            if len(rows) < batch_size:
+                return
+            rows = list(queryset.filter(pk__gt=rows[-1][0])[:batch_size])
+
+    @classmethod
+    def _count_queued_tasks(cls, index_name: str) -> int:
+        """Returns the number of enqueued or processing tasks of the index."""
+        return (
+            cls.meilisearch_client()
+            .get_tasks(
+                {
+                    "indexUids": [index_name],
+                    "statuses": ["enqueued", "processing"],
+                    "limit": 1,
+                }
+            )
+            .total
+        )
+
+    @classmethod
+    def _wait_for_task_queue(cls, index_name: str) -> float:
+        """Waits while the index task queue is full and returns the time waited."""
+        max_queued_tasks = cls.INDEX_MAX_QUEUED_TASKS
+        if max_queued_tasks is None:
+            return 0.0
+        if max_queued_tasks < 1:
+            raise ImproperlyConfigured(
+                f"{cls.__name__}.INDEX_MAX_QUEUED_TASKS must be at least 1"
+            )
+        start = monotonic()
+        deadline = start + cls.TASKS_TIMEOUT
+        interval = cls.TASKS_POLL_INTERVAL
+        throttled = False
+        while True:
+            queued = cls._count_queued_tasks(index_name)
+            if queued < max_queued_tasks:
+                return monotonic() - start if throttled else 0.0
+            if monotonic() >= deadline:
+                raise MeilisearchTimeoutError(
+                    f"Timeout of {cls.TASKS_TIMEOUT}s exceeded while waiting for "
+                    f"the {queued} queued tasks of {index_name}"
+                )
+            throttled = True
+            sleep(min(interval, max(deadline - monotonic(), 0)))
+            interval = min(interval * 2, cls.TASKS_POLL_MAX_INTERVAL)
+
+    @classmethod
+    def _fetch_batch(cls, queryset: QuerySet[M]) -> List[M]:
+        """Evaluates the queryset of a batch (and its prefetches)."""
+        start = monotonic()
+        batch = list(queryset)
+        cls._emit(INDEX_FETCH_SECONDS, monotonic() - start)
+        cls._emit(INDEX_FETCH_ROWS, len(batch))
+        return batch
+
+
+# --------------------------------------------------
+# Sharded indexing workers
+# --------------------------------------------------
+def _init_shard_worker() -> None:
+    """Sets Django up in spawned worker processes (forked ones already are)."""
+    if not apps.ready:
+        django.setup()
+
+
+def _index_shard(
+    indexer: Union[
+        Type[MeilisearchModelIndexer], Tuple[Type[MeilisearchModelIndexer], str]
+    ],
+    query: Q,
+    index_name: str,
+    batch_size: Optional[int],
+    upload_workers: Optional[int],
+) -> List[TaskInfo]:
+    """Indexes one shard from a worker process."""
+    if isinstance(indexer, tuple):
+        parent, tenant = indexer
+        indexer = parent.for_shard(tenant)
+    try:
+        return indexer._index_from_query(query, index_name, batch_size, upload_workers)
+    except MeilisearchIndexingError as error:
+        # Errors must survive the trip back to the parent process
+        raise MeilisearchIndexingError(
+            [
+                batch._replace(error=_portable_error(batch.error))
+                for batch in error.failed_batches
+            ]
+        ) from None
+    except Exception as error:
+        raise _portable_error(error) from None
+
+
+def _portable_error(error: BaseException) -> BaseException:
+    """Returns the error if it can be pickled, or a RuntimeError describing it."""
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+    return error
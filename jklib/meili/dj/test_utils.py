@@ -1,11 +1,14 @@
-from time import sleep
-from typing import Dict, Generic, List, Type, TypeVar
+from contextlib import suppress
+from typing import Dict, Generic, List, Set, Type, TypeVar, Union
 
 from django.db.models import Model, Q
-from django.test import tag
+from django.test import override_settings, tag
 from meilisearch import Client
+from meilisearch.models.task import TaskInfo
 
 from jklib.meili.dj.indexer import MeilisearchModelIndexer
+from jklib.meili.exceptions import MeilisearchTaskError
+from jklib.meili.fake import FakeMeilisearchServer
 
 M = TypeVar("M", bound=Model)
 
@@ -27,12 +30,14 @@ class IndexerBaseTestMixin(Generic[M]):
     item_1: M
     item_2: M
     search_attribute: str
-    sleep_time: float = 0.1
 
     def setUp(self) -> None:
         super().setUp()  # type: ignore
-        self.meilisearch_client.delete_index(self.indexer_class.index_name())
-        sleep(self.sleep_time)
+        # Fails if the index does not exist yet
+        with suppress(MeilisearchTaskError):
+            self.wait_for(
+                self.meilisearch_client.delete_index(self.indexer_class.index_name())
+            )
 
     def tearDown(self) -> None:
         self.meilisearch_client.delete_index(self.indexer_class.index_name())
@@ -40,137 +45,141 @@ class IndexerBaseTestMixin(Generic[M]):
 
     def test_index_exists(self) -> None:
         self.assertFalse(self.indexer_class.index_exists())
-        self.meilisearch_client.create_index(self.indexer_class.index_name())
-        sleep(self.sleep_time)
+        self.wait_for(
+            self.meilisearch_client.create_index(self.indexer_class.index_name())
+        )
         self.assertTrue(self.indexer_class.index_exists())
 
     def test_maybe_create_index(self) -> None:
         self.assertFalse(self.indexer_class.index_exists())
-        self.indexer_class.maybe_create_index()
-        sleep(self.sleep_time)
+        self.wait_for(self.indexer_class.maybe_create_index())
         self.assertTrue(self.indexer_class.index_exists())
 
     def test_update_settings(self) -> None:
-        self.meilisearch_client.create_index(self.indexer_class.index_name())
-        sleep(self.sleep_time)
-        self.indexer_class.update_settings()
-        sleep(self.sleep_time)
+        self.wait_for(
+            self.meilisearch_client.create_index(self.indexer_class.index_name())
+        )
+        self.wait_for(self.indexer_class.update_settings())
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).get_settings()
         for key, value in self.indexer_class.SETTINGS.items():
             self.assertEqual(response[key], value)
 
+    def test_update_settings_without_changes(self) -> None:
+        self.wait_for(self.indexer_class.maybe_create_index())
+        self.assertIsNone(self.indexer_class.update_settings())
+
     def test_index(self) -> None:
-        self.meilisearch_client.create_index(self.indexer_class.index_name())
-        sleep(self.sleep_time)
+        self.wait_for(
+            self.meilisearch_client.create_index(self.indexer_class.index_name())
+        )
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search(getattr(self.item_1, self.search_attribute))
         self.assertSearchHits(response, [])
-        self.indexer_class.index(self.item_1)
-        sleep(self.sleep_time)
+        self.wait_for(self.indexer_class.index(self.item_1))
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search(getattr(self.item_1, self.search_attribute))
         self.assertSearchHits(response, [self.item_1])
 
     def test_index_multiple(self) -> None:
-        self.meilisearch_client.create_index(self.indexer_class.index_name())
-        sleep(self.sleep_time)
+        self.wait_for(
+            self.meilisearch_client.create_index(self.indexer_class.index_name())
+        )
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search("")
         self.assertSearchHits(response, [])
-        self.indexer_class.index_multiple([self.item_1, self.item_2])
-        sleep(self.sleep_time)
+        self.wait_for(self.indexer_class.index_multiple([self.item_1, self.item_2]))
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search("")
         self.assertSearchHits(response, [self.item_1, self.item_2])
 
     def test_index_from_query(self) -> None:
-        self.meilisearch_client.create_index(self.indexer_class.index_name())
-        sleep(self.sleep_time)
+        self.wait_for(
+            self.meilisearch_client.create_index(self.indexer_class.index_name())
+        )
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search(getattr(self.item_1, self.search_attribute))
         self.assertSearchHits(response, [])
-        self.indexer_class.index_from_query(Q(id=self.item_1.id))
-        sleep(self.sleep_time)
+        self.wait_for(self.indexer_class.index_from_query(Q(id=self.item_1.id)))
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search(getattr(self.item_1, self.search_attribute))
         self.assertSearchHits(response, [self.item_1])
 
     def test_index_all(self) -> None:
-        self.meilisearch_client.create_index(self.indexer_class.index_name())
-        sleep(self.sleep_time)
+        self.wait_for(
+            self.meilisearch_client.create_index(self.indexer_class.index_name())
+        )
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search("")
         self.assertSearchHits(response, [])
-        self.indexer_class.index_all()
-        sleep(self.sleep_time)
+        self.wait_for(self.indexer_class.index_all())
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search("")
         self.assertSearchHits(response, [self.item_1, self.item_2])
 
     def test_index_all_atomically(self) -> None:
-        self.meilisearch_client.create_index(self.indexer_class.index_name())
-        sleep(self.sleep_time)
+        self.wait_for(
+            self.meilisearch_client.create_index(self.indexer_class.index_name())
+        )
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search("")
         self.assertEqual(response["hits"], [])
-        self.indexer_class.index_all_atomically()
-        sleep(self.sleep_time)
+        self.wait_for(self.indexer_class.index_all_atomically())
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search("")
         self.assertSearchHits(response, [self.item_1, self.item_2])
 
     def test_unindex(self) -> None:
-        self.meilisearch_client.create_index(self.indexer_class.index_name())
-        sleep(self.sleep_time)
-        self.indexer_class.index(self.item_1)
-        sleep(self.sleep_time)
+        self.wait_for(
+            self.meilisearch_client.create_index(self.indexer_class.index_name())
+        )
+        self.wait_for(self.indexer_class.index(self.item_1))
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search(getattr(self.item_1, self.search_attribute))
         self.assertSearchHits(response, [self.item_1])
-        self.indexer_class.unindex(self.item_1.id)
-        sleep(self.sleep_time)
+        self.wait_for(self.indexer_class.unindex(self.item_1.id))
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search(getattr(self.item_1, self.search_attribute))
         self.assertSearchHits(response, [])
 
     def test_unindex_multiple(self) -> None:
-        self.meilisearch_client.create_index(self.indexer_class.index_name())
-        sleep(self.sleep_time)
-        self.indexer_class.index_multiple([self.item_1, self.item_2])
-        sleep(self.sleep_time)
+        self.wait_for(
+            self.meilisearch_client.create_index(self.indexer_class.index_name())
+        )
+        self.wait_for(self.indexer_class.index_multiple([self.item_1, self.item_2]))
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search("")
         self.assertSearchHits(response, [self.item_1, self.item_2])
-        self.indexer_class.unindex_multiple([self.item_1.id, self.item_2.id])
-        sleep(self.sleep_time)
+        self.wait_for(
+            self.indexer_class.unindex_multiple([self.item_1.id, self.item_2.id])
+        )
         response = self.meilisearch_client.index(
             self.indexer_class.index_name()
         ).search("")
         self.assertSearchHits(response, [])
 
     def test_search(self) -> None:
-        self.meilisearch_client.create_index(self.indexer_class.index_name())
+        self.wait_for(
+            self.meilisearch_client.create_index(self.indexer_class.index_name())
+        )
         search_value = getattr(self.item_1, self.search_attribute)
-        sleep(self.sleep_time)
         response = self.indexer_class.search(search_value)
         self.assertSearchHits(response, [])  # type: ignore
-        self.indexer_class.index(self.item_1)
-        sleep(self.sleep_time)
+        self.wait_for(self.indexer_class.index(self.item_1))
         response = self.indexer_class.search(search_value)
         self.assertSearchHits(response, [self.item_1])  # type: ignore
         self.assertEqual(response.get("limit"), 20)
@@ -184,8 +193,43 @@ class IndexerBaseTestMixin(Generic[M]):
     def test_meilisearch_client(self) -> None:
         self.assertIsInstance(self.indexer_class.meilisearch_client(), Client)
 
+    def wait_for(self, tasks: Union[None, TaskInfo, List[TaskInfo]]) -> None:
+        """Waits for the Meilisearch task(s) to be processed."""
+        if tasks is None:
+            tasks = []
+        elif isinstance(tasks, TaskInfo):
+            tasks = [tasks]
+        self.indexer_class.wait_for_tasks(tasks)
+
     def assertSearchHits(self, response: Dict, items: List[M]) -> None:
         ids = {hit["id"] for hit in response["hits"]}
         self.assertSetEqual(
             ids, {getattr(item, self.indexer_class.PRIMARY_KEY) for item in items}
         )
+
+
+class FakeIndexerBaseTestMixin(IndexerBaseTestMixin[M]):
+    """`IndexerBaseTestMixin` running against an in-process `FakeMeilisearchServer`."""
+
+    tags: Set[str] = set()
+    fake_meilisearch: FakeMeilisearchServer
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.fake_meilisearch = FakeMeilisearchServer().start()
+        super().setUpClass()  # type: ignore
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()  # type: ignore
+        cls.fake_meilisearch.stop()
+
+    def setUp(self) -> None:
+        self.fake_meilisearch.reset()
+        self.meilisearch_client = self.fake_meilisearch.client()
+        settings_override = override_settings(
+            MEILISEARCH_HOST=self.fake_meilisearch.url, MEILISEARCH_API_KEY="fake"
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        super().setUp()
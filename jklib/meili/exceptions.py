@@ -0,0 +1,43 @@
+from typing import Any, List, NamedTuple, Tuple, Type
+
+from meilisearch.models.task import Task
+
+from jklib.meili.types import MeilisearchDocumentsBatch
+
+
+class FailedBatch(NamedTuple):
+    """A batch of documents that could not be uploaded to an index."""
+
+    index_name: str
+    number: int
+    documents: MeilisearchDocumentsBatch
+    error: BaseException
+
+
+class MeilisearchIndexingError(Exception):
+    """Raised when one or several batches failed during a bulk indexing."""
+
+    def __init__(self, failed_batches: List[FailedBatch]) -> None:
+        self.failed_batches = failed_batches
+        numbers = ", ".join(str(batch.number) for batch in failed_batches)
+        super().__init__(
+            f"{len(failed_batches)} batch(es) failed to be indexed: {numbers}"
+        )
+
+    def __reduce__(self) -> Tuple[Type["MeilisearchIndexingError"], Tuple[Any, ...]]:
+        return self.__class__, (self.failed_batches,)
+
+
+class MeilisearchTaskError(Exception):
+    """Raised when one or several Meilisearch tasks did not succeed."""
+
+    def __init__(self, failed_tasks: List[Task]) -> None:
+        self.failed_tasks = failed_tasks
+        details = ", ".join(
+            f"{task.uid} ({task.status}: {(task.error or {}).get('code')})"
+            for task in failed_tasks
+        )
+        super().__init__(f"{len(failed_tasks)} task(s) did not succeed: {details}")
+
+    def __reduce__(self) -> Tuple[Type["MeilisearchTaskError"], Tuple[Any, ...]]:
+        return self.__class__, (self.failed_tasks,)
@@ -0,0 +1,816 @@
+"""
+In-memory stand-in for a Meilisearch server, served over HTTP on localhost.
+
+It implements the subset of the API used by the indexers (indexes, settings,
+documents, swaps, search and multi-search with the filter grammar, and tasks)
+so that they can be tested quickly and without network access. Tasks are
+processed as soon as they are enqueued.
+
+Example:
+    with FakeMeilisearchServer() as server:
+        client = server.client()
+        client.create_index("books", {"primaryKey": "id"})
+"""
+
+from datetime import datetime, timezone
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from meilisearch import Client
+
+# --------------------------------------------------
+# Filters
+# --------------------------------------------------
+FILTER_TOKEN_PATTERN = re.compile(
+    r'\s*(?:(?P<string>"(?:[^"\\]|\\.)*")'
+    r"|(?P<symbol>!=|>=|<=|[=<>()\[\],])"
+    r'|(?P<word>[^\s=!<>()\[\],"]+))'
+)
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+class FakeMeilisearchError(Exception):
+    """An API error, sent back with its HTTP status and Meilisearch code."""
+
+    def __init__(self, status: int, code: str, message: str) -> None:
+        self.status = status
+        self.code = code
+        self.message = message
+        super().__init__(message)
+
+    def to_dict(self) -> Dict[str, str]:
+        return {
+            "message": self.message,
+            "code": self.code,
+            "type": "invalid_request",
+            "link": f"https://docs.meilisearch.com/errors#{self.code}",
+        }
+
+
+class _FilterParser:
+    """Parses a Meilisearch filter expression into a predicate on documents."""
+
+    def __init__(self, expression: str, filterable: List[str], code: str) -> None:
+        self.tokens = list(self._tokenize(expression))
+        self.position = 0
+        self.filterable = filterable
+        self.code = code
+
+    def parse(self) -> Predicate:
+        predicate = self._parse_or()
+        if self.position < len(self.tokens):
+            self._fail(f"Unexpected `{self.tokens[self.position][1]}`")
+        return predicate
+
+    # Grammar
+    def _parse_or(self) -> Predicate:
+        predicates = [self._parse_and()]
+        while self._accept_keyword("OR"):
+            predicates.append(self._parse_and())
+        if len(predicates) == 1:
+            return predicates[0]
+        return lambda doc: any(predicate(doc) for predicate in predicates)
+
+    def _parse_and(self) -> Predicate:
+        predicates = [self._parse_not()]
+        while self._accept_keyword("AND"):
+            predicates.append(self._parse_not())
+        if len(predicates) == 1:
+            return predicates[0]
+        return lambda doc: all(predicate(doc) for predicate in predicates)
+
+    def _parse_not(self) -> Predicate:
+        if self._accept_keyword("NOT"):
+            predicate = self._parse_not()
+            return lambda doc: not predicate(doc)
+        if self._accept_symbol("("):
+            predicate = self._parse_or()
+            self._expect_symbol(")")
+            return predicate
+        return self._parse_condition()
+
+    def _parse_condition(self) -> Predicate:
+        field = self._next_value()
+        if not any(
+            field == attribute or field.startswith(f"{attribute}.")
+            for attribute in self.filterable
+        ):
+            self._fail(f"Attribute `{field}` is not filterable")
+        negated = self._accept_keyword("NOT")
+        if self._accept_keyword("IN"):
+            values = self._parse_list()
+            return self._negate(
+                lambda doc: any(_matches(doc, field, "=", v) for v in values), negated
+            )
+        if self._accept_keyword("EXISTS"):
+            return self._negate(lambda doc: _resolve(doc, field)[0], negated)
+        if negated:
+            self._fail("Expected `IN` or `EXISTS` after `NOT`")
+        if self._accept_keyword("IS"):
+            negated = self._accept_keyword("NOT")
+            if self._accept_keyword("EMPTY"):
+                return self._negate(
+                    lambda doc: _resolve(doc, field)[1] in ("", [], {}), negated
+                )
+            if self._accept_keyword("NULL"):
+                return self._negate(
+                    lambda doc: _resolve(doc, field) == (True, None), negated
+                )
+            self._fail("Expected `EMPTY` or `NULL` after `IS`")
+        kind, operator = self._next()
+        if kind != "symbol" or operator not in ("=", "!=", ">", ">=", "<", "<="):
+            self._fail(f"Expected an operator after `{field}`")
+        value = self._next_value()
+        if operator == "!=":
+            return lambda doc: not _matches(doc, field, "=", value)
+        return lambda doc: _matches(doc, field, operator, value)
+
+    def _parse_list(self) -> List[Any]:
+        self._expect_symbol("[")
+        values = []
+        while not self._accept_symbol("]"):
+            values.append(self._next_value())
+            if not self._accept_symbol(","):
+                self._expect_symbol("]")
+                break
+        return values
+
+    # Tokens
+    @staticmethod
+    def _tokenize(expression: str) -> Iterator[Tuple[str, str]]:
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = FILTER_TOKEN_PATTERN.match(expression, position)
+            if match is None or match.end() == position:
+                raise FakeMeilisearchError(
+                    400, "invalid_search_filter", f"Invalid filter `{expression}`"
+                )
+            position = match.end()
+            kind = match.lastgroup or "word"
+            yield kind, match.group(kind)
+
+    def _next(self) -> Tuple[str, str]:
+        if self.position >= len(self.tokens):
+            self._fail("Unexpected end of filter")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _next_value(self) -> Any:
+        kind, value = self._next()
+        if kind == "string":
+            # Like Meilisearch, only escaped quotes are unescaped
+            return value[1:-1].replace('\\"', '"')
+        if kind == "word":
+            return value
+        self._fail(f"Unexpected `{value}`")
+
+    def _accept_keyword(self, keyword: str) -> bool:
+        if self.position < len(self.tokens) and self.tokens[self.position] == (
+            "word",
+            keyword,
+        ):
+            self.position += 1
+            return True
+        return False
+
+    def _accept_symbol(self, symbol: str) -> bool:
+        if self.position < len(self.tokens) and self.tokens[self.position] == (
+            "symbol",
+            symbol,
+        ):
+            self.position += 1
+            return True
+        return False
+
+    def _expect_symbol(self, symbol: str) -> None:
+        if not self._accept_symbol(symbol):
+            self._fail(f"Expected `{symbol}`")
+
+    def _fail(self, message: str) -> Any:
+        raise FakeMeilisearchError(400, self.code, message)
+
+    @staticmethod
+    def _negate(predicate: Predicate, negated: bool) -> Predicate:
+        if negated:
+            return lambda doc: not predicate(doc)
+        return predicate
+
+
+def _resolve(doc: Dict[str, Any], field: str) -> Tuple[bool, Any]:
+    """Returns whether the (dotted) field exists in the document, and its value."""
+    value: Any = doc
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return False, None
+        value = value[part]
+    return True, value
+
+
+def _normalize(value: Any) -> Any:
+    """Returns the value as a float if it is numeric, else as a lowercase string."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value).lower()
+
+
+def _matches(doc: Dict[str, Any], field: str, operator: str, expected: Any) -> bool:
+    exists, value = _resolve(doc, field)
+    if not exists or value is None:
+        return False
+    values = value if isinstance(value, list) else [value]
+    expected = _normalize(expected)
+    for item in (_normalize(v) for v in values):
+        if operator == "=":
+            if item == expected:
+                return True
+        elif isinstance(item, float) and isinstance(expected, float):
+            if (
+                (operator == ">" and item > expected)
+                or (operator == ">=" and item >= expected)
+                or (operator == "<" and item < expected)
+                or (operator == "<=" and item <= expected)
+            ):
+                return True
+    return False
+
+
+# --------------------------------------------------
+# State
+# --------------------------------------------------
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    "displayedAttributes": ["*"],
+    "searchableAttributes": ["*"],
+    "filterableAttributes": [],
+    "sortableAttributes": [],
+    "rankingRules": ["words", "typo", "proximity", "attribute", "sort", "exactness"],
+    "stopWords": [],
+    "nonSeparatorTokens": [],
+    "separatorTokens": [],
+    "dictionary": [],
+    "synonyms": {},
+    "distinctAttribute": None,
+    "proximityPrecision": "byWord",
+    "typoTolerance": {
+        "enabled": True,
+        "minWordSizeForTypos": {"oneTypo": 5, "twoTypos": 9},
+        "disableOnWords": [],
+        "disableOnAttributes": [],
+    },
+    "faceting": {"maxValuesPerFacet": 100, "sortFacetValuesBy": {"*": "alpha"}},
+    "pagination": {"maxTotalHits": 1000},
+    "searchCutoffMs": None,
+}
+
+
+class FakeIndex:
+    """An index of the fake server: its documents (by primary key) and settings."""
+
+    def __init__(self, uid: str, primary_key: Optional[str] = None) -> None:
+        self.uid = uid
+        self.primary_key = primary_key
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.settings: Dict[str, Any] = json.loads(json.dumps(DEFAULT_SETTINGS))
+        self.created_at = self.updated_at = _now()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "uid": self.uid,
+            "primaryKey": self.primary_key,
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at,
+        }
+
+    def filter(self, expression: Optional[Any], code: str) -> List[Dict[str, Any]]:
+        """Returns the documents matching the filter expression."""
+        documents = list(self.documents.values())
+        if isinstance(expression, list):
+            expression = " AND ".join(f"({e})" for e in expression)
+        if not expression:
+            return documents
+        filterable = self.settings["filterableAttributes"] or []
+        predicate = _FilterParser(expression, filterable, code).parse()
+        return [doc for doc in documents if predicate(doc)]
+
+    def add_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        primary_key: Optional[str],
+        merge: bool = False,
+    ) -> int:
+        """Adds or replaces the documents, or updates them with `merge`."""
+        if self.primary_key is None:
+            self.primary_key = primary_key or self._infer_primary_key(documents)
+        for document in documents:
+            if self.primary_key not in document:
+                raise FakeMeilisearchError(
+                    400,
+                    "missing_document_id",
+                    f"Document doesn't have a `{self.primary_key}` attribute",
+                )
+        for document in documents:
+            key = str(document[self.primary_key])
+            if merge and key in self.documents:
+                document = {**self.documents[key], **document}
+            self.documents[key] = document
+        self.updated_at = _now()
+        return len(documents)
+
+    @staticmethod
+    def _infer_primary_key(documents: List[Dict[str, Any]]) -> str:
+        for document in documents[:1]:
+            candidates = [key for key in document if key.lower().endswith("id")]
+            if len(candidates) == 1:
+                return candidates[0]
+        raise FakeMeilisearchError(
+            400, "index_primary_key_no_candidate_found", "No primary key found"
+        )
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class FakeMeilisearch:
+    """The state of the fake server, and the implementation of its routes."""
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Removes every index and task."""
+        self.indexes: Dict[str, FakeIndex] = {}
+        self.tasks: List[Dict[str, Any]] = []
+        self.requests: List[Tuple[str, str]] = []
+
+    def handle(
+        self, method: str, path: str, query: Dict[str, str], body: Any
+    ) -> Tuple[int, Any]:
+        """Routes the request and returns the response status and body."""
+        parts = [part for part in path.split("/") if part]
+        self.requests.append((method, path))
+        route: Tuple[str, ...] = (method, *parts)
+        args = []
+        if parts[:1] in (["indexes"], ["tasks"]) and len(parts) >= 2:
+            route = (method, parts[0], "{}", *parts[2:])
+            args = [parts[1]]
+            if len(parts) == 4 and parts[2] == "documents":
+                if parts[3] not in ("fetch", "delete-batch", "delete"):
+                    route = (method, parts[0], "{}", "documents", "{}")
+                    args.append(unquote(parts[3]))
+        routes: Dict[Tuple[str, ...], Callable[..., Tuple[int, Any]]] = {
+            ("GET", "health"): lambda: (200, {"status": "available"}),
+            ("GET", "version"): lambda: (200, {"pkgVersion": "fake"}),
+            ("GET", "indexes"): self._list_indexes,
+            ("POST", "indexes"): self._create_index,
+            ("GET", "indexes", "{}"): self._get_index,
+            ("DELETE", "indexes", "{}"): self._delete_index,
+            ("GET", "indexes", "{}", "settings"): self._get_settings,
+            ("PATCH", "indexes", "{}", "settings"): self._update_settings,
+            ("GET", "indexes", "{}", "documents"): self._get_documents,
+            ("GET", "indexes", "{}", "documents", "{}"): self._get_document,
+            ("POST", "indexes", "{}", "documents"): self._add_documents,
+            ("PUT", "indexes", "{}", "documents"): self._update_documents,
+            ("POST", "indexes", "{}", "documents", "fetch"): self._fetch_documents,
+            ("POST", "indexes", "{}", "documents", "delete-batch"): self._delete_batch,
+            ("POST", "indexes", "{}", "documents", "delete"): self._delete_by_filter,
+            ("POST", "indexes", "{}", "search"): self._search,
+            ("POST", "multi-search"): self._multi_search,
+            ("POST", "swap-indexes"): self._swap_indexes,
+            ("GET", "tasks"): self._get_tasks,
+            ("GET", "tasks", "{}"): self._get_task,
+        }
+        handler = routes.get(route)
+        if handler is None:
+            raise FakeMeilisearchError(404, "not_found", f"{method} /{path} not found")
+        kwargs = {"query": query, "body": body}
+        parameters = handler.__code__.co_varnames[: handler.__code__.co_argcount]
+        return handler(*args, **{k: v for k, v in kwargs.items() if k in parameters})
+
+    # Tasks
+    def _enqueue(
+        self, index_uid: Optional[str], type_: str, process: Callable[[], Any]
+    ) -> Tuple[int, Dict[str, Any]]:
+        """Creates the task, processes it right away, and returns its summary."""
+        enqueued_at = _now()
+        task: Dict[str, Any] = {
+            "uid": len(self.tasks),
+            "indexUid": index_uid,
+            "status": "succeeded",
+            "type": type_,
+            "canceledBy": None,
+            "details": None,
+            "error": None,
+            "duration": "PT0S",
+            "enqueuedAt": enqueued_at,
+            "startedAt": enqueued_at,
+            "finishedAt": None,
+        }
+        self.tasks.append(task)
+        try:
+            task["details"] = process()
+        except FakeMeilisearchError as error:
+            task["status"] = "failed"
+            task["error"] = error.to_dict()
+        task["finishedAt"] = _now()
+        summary = {
+            "taskUid": task["uid"],
+            "indexUid": index_uid,
+            "status": "enqueued",
+            "type": type_,
+            "enqueuedAt": enqueued_at,
+        }
+        return 202, summary
+
+    def _get_tasks(self, query: Dict[str, str]) -> Tuple[int, Any]:
+        tasks = list(reversed(self.tasks))
+        for param, key in (
+            ("uids", "uid"),
+            ("statuses", "status"),
+            ("types", "type"),
+            ("indexUids", "indexUid"),
+        ):
+            if param in query:
+                accepted = set(query[param].split(","))
+                tasks = [task for task in tasks if str(task[key]) in accepted]
+        if "from" in query:
+            tasks = [task for task in tasks if task["uid"] <= int(query["from"])]
+        limit = int(query.get("limit", 20))
+        next_ = tasks[limit]["uid"] if len(tasks) > limit else None
+        first = tasks[0]["uid"] if len(tasks) > 0 else None
+        return 200, {
+            "results": tasks[:limit],
+            "total": len(tasks),
+            "limit": limit,
+            "from": first,
+            "next": next_,
+        }
+
+    def _get_task(self, uid: str) -> Tuple[int, Any]:
+        if not uid.isdigit() or int(uid) >= len(self.tasks):
+            raise FakeMeilisearchError(404, "task_not_found", f"Task `{uid}` not found")
+        return 200, self.tasks[int(uid)]
+
+    # Indexes
+    def _index(self, uid: str) -> FakeIndex:
+        if uid not in self.indexes:
+            raise FakeMeilisearchError(
+                404, "index_not_found", f"Index `{uid}` not found."
+            )
+        return self.indexes[uid]
+
+    def _list_indexes(self, query: Dict[str, str]) -> Tuple[int, Any]:
+        offset, limit = int(query.get("offset", 0)), int(query.get("limit", 20))
+        indexes = [index.to_dict() for index in self.indexes.values()]
+        return 200, {
+            "results": indexes[offset : offset + limit],
+            "offset": offset,
+            "limit": limit,
+            "total": len(indexes),
+        }
+
+    def _get_index(self, uid: str) -> Tuple[int, Any]:
+        return 200, self._index(uid).to_dict()
+
+    def _create_index(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        uid = body["uid"]
+
+        def process() -> Dict[str, Any]:
+            if uid in self.indexes:
+                raise FakeMeilisearchError(
+                    409, "index_already_exists", f"Index `{uid}` already exists."
+                )
+            self.indexes[uid] = FakeIndex(uid, body.get("primaryKey"))
+            return {"primaryKey": body.get("primaryKey")}
+
+        return self._enqueue(uid, "indexCreation", process)
+
+    def _delete_index(self, uid: str) -> Tuple[int, Any]:
+        def process() -> Dict[str, Any]:
+            self._index(uid)
+            deleted = len(self.indexes.pop(uid).documents)
+            return {"deletedDocuments": deleted}
+
+        return self._enqueue(uid, "indexDeletion", process)
+
+    def _swap_indexes(self, body: List[Dict[str, List[str]]]) -> Tuple[int, Any]:
+        def process() -> Dict[str, Any]:
+            for swap in body:
+                a, b = (self._index(uid) for uid in swap["indexes"])
+                self.indexes[a.uid], self.indexes[b.uid] = b, a
+                a.uid, b.uid = b.uid, a.uid
+            return {"swaps": body}
+
+        return self._enqueue(None, "indexSwap", process)
+
+    # Settings
+    def _get_settings(self, uid: str) -> Tuple[int, Any]:
+        return 200, self._index(uid).settings
+
+    def _update_settings(self, uid: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        def process() -> Dict[str, Any]:
+            index = self.indexes.setdefault(uid, FakeIndex(uid))
+            for key, value in body.items():
+                index.settings[key] = (
+                    DEFAULT_SETTINGS.get(key) if value is None else value
+                )
+            return body
+
+        return self._enqueue(uid, "settingsUpdate", process)
+
+    # Documents
+    def _add_documents(
+        self, uid: str, query: Dict[str, str], body: Any
+    ) -> Tuple[int, Any]:
+        def process() -> Dict[str, Any]:
+            index = self.indexes.setdefault(uid, FakeIndex(uid))
+            count = index.add_documents(body, query.get("primaryKey"))
+            return {"receivedDocuments": count, "indexedDocuments": count}
+
+        return self._enqueue(uid, "documentAdditionOrUpdate", process)
+
+    def _update_documents(
+        self, uid: str, query: Dict[str, str], body: Any
+    ) -> Tuple[int, Any]:
+        def process() -> Dict[str, Any]:
+            index = self.indexes.setdefault(uid, FakeIndex(uid))
+            count = index.add_documents(body, query.get("primaryKey"), merge=True)
+            return {"receivedDocuments": count, "indexedDocuments": count}
+
+        return self._enqueue(uid, "documentAdditionOrUpdate", process)
+
+    def _get_documents(self, uid: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        fields = query["fields"].split(",") if "fields" in query else None
+        return self._paginate_documents(
+            self._index(uid).filter(query.get("filter"), "invalid_document_filter"),
+            int(query.get("offset", 0)),
+            int(query.get("limit", 20)),
+            fields,
+        )
+
+    def _get_document(self, uid: str, document_id: str) -> Tuple[int, Any]:
+        document = self._index(uid).documents.get(document_id)
+        if document is None:
+            raise FakeMeilisearchError(
+                404, "document_not_found", f"Document `{document_id}` not found."
+            )
+        return 200, document
+
+    def _fetch_documents(self, uid: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        return self._paginate_documents(
+            self._index(uid).filter(body.get("filter"), "invalid_document_filter"),
+            body.get("offset") or 0,
+            body.get("limit") or 20,
+            body.get("fields"),
+        )
+
+    @staticmethod
+    def _paginate_documents(
+        documents: List[Dict[str, Any]],
+        offset: int,
+        limit: int,
+        fields: Optional[List[str]],
+    ) -> Tuple[int, Any]:
+        results = documents[offset : offset + limit]
+        if fields is not None and "*" not in fields:
+            results = [{k: v for k, v in d.items() if k in fields} for d in results]
+        return 200, {
+            "results": results,
+            "offset": offset,
+            "limit": limit,
+            "total": len(documents),
+        }
+
+    def _delete_batch(self, uid: str, body: List[Any]) -> Tuple[int, Any]:
+        def process() -> Dict[str, Any]:
+            index = self._index(uid)
+            deleted = sum(
+                index.documents.pop(str(id_), None) is not None for id_ in body
+            )
+            return {"providedIds": len(body), "deletedDocuments": deleted}
+
+        return self._enqueue(uid, "documentDeletion", process)
+
+    def _delete_by_filter(self, uid: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        expression = body.get("filter")
+        if not expression:
+            raise FakeMeilisearchError(
+                400, "missing_document_filter", "Missing `filter` in request body"
+            )
+
+        def process() -> Dict[str, Any]:
+            index = self._index(uid)
+            matches = index.filter(expression, "invalid_document_filter")
+            for document in matches:
+                index.documents.pop(str(document[index.primary_key]), None)
+            return {
+                "originalFilter": json.dumps(expression),
+                "deletedDocuments": len(matches),
+            }
+
+        return self._enqueue(uid, "documentDeletion", process)
+
+    # Search
+    def _search(self, uid: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        index = self._index(uid)
+        query = body.get("q") or ""
+        hits = index.filter(body.get("filter"), "invalid_search_filter")
+        words = re.findall(r"\w+", query.lower())
+        if len(words) > 0:
+            hits = [doc for doc in hits if self._match_words(index, doc, words)]
+        scores = {id(doc): self._ranking_score(index, doc, words) for doc in hits}
+        hits.sort(key=lambda doc: scores[id(doc)], reverse=True)
+        for rule in reversed(body.get("sort") or []):
+            field, _, direction = rule.rpartition(":")
+            if field not in (index.settings["sortableAttributes"] or []):
+                raise FakeMeilisearchError(
+                    400, "invalid_search_sort", f"Attribute `{field}` is not sortable"
+                )
+            present = [doc for doc in hits if _resolve(doc, field)[1] is not None]
+            missing = [doc for doc in hits if _resolve(doc, field)[1] is None]
+            present.sort(
+                key=lambda doc: _normalize(_resolve(doc, field)[1]),
+                reverse=direction == "desc",
+            )
+            hits = present + missing
+        documents = hits
+        retrieve = (
+            body.get("attributesToRetrieve") or index.settings["displayedAttributes"]
+        )
+        if "*" not in retrieve:
+            hits = [{k: v for k, v in doc.items() if k in retrieve} for doc in hits]
+        if body.get("showRankingScore"):
+            hits = [
+                {**hit, "_rankingScore": scores[id(doc)]}
+                for hit, doc in zip(hits, documents)
+            ]
+        response: Dict[str, Any] = {"query": query, "processingTimeMs": 0}
+        if body.get("page") is not None or body.get("hitsPerPage") is not None:
+            page, per_page = body.get("page") or 1, body.get("hitsPerPage") or 20
+            response.update(
+                hits=hits[(page - 1) * per_page : page * per_page],
+                page=page,
+                hitsPerPage=per_page,
+                totalHits=len(hits),
+                totalPages=-(-len(hits) // per_page),
+            )
+        else:
+            offset = body.get("offset") or 0
+            limit = body.get("limit") if body.get("limit") is not None else 20
+            response.update(
+                hits=hits[offset : offset + limit],
+                offset=offset,
+                limit=limit,
+                estimatedTotalHits=len(hits),
+            )
+        return 200, response
+
+    def _multi_search(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        results = []
+        for query in body["queries"]:
+            params = {k: v for k, v in query.items() if k != "indexUid"}
+            _, result = self._search(query["indexUid"], params)
+            results.append({"indexUid": query["indexUid"], **result})
+        return 200, {"results": results}
+
+    @staticmethod
+    def _match_words(index: FakeIndex, doc: Dict[str, Any], words: List[str]) -> bool:
+        doc_words = FakeMeilisearch._doc_words(index, doc)
+        return all(any(w.startswith(word) for w in doc_words) for word in words)
+
+    @staticmethod
+    def _ranking_score(
+        index: FakeIndex, doc: Dict[str, Any], words: List[str]
+    ) -> float:
+        """Scores 1 per exact word match, and the matched ratio per prefix match."""
+        if len(words) == 0:
+            return 1.0
+        doc_words = FakeMeilisearch._doc_words(index, doc)
+        score = 0.0
+        for word in words:
+            lengths = [len(w) for w in doc_words if w.startswith(word)]
+            score += len(word) / min(lengths) if len(lengths) > 0 else 0.0
+        return score / len(words)
+
+    @staticmethod
+    def _doc_words(index: FakeIndex, doc: Dict[str, Any]) -> Set[str]:
+        searchable = index.settings["searchableAttributes"] or ["*"]
+        values = [
+            value
+            for key, value in doc.items()
+            if "*" in searchable or key in searchable
+        ]
+        return set(re.findall(r"\w+", json.dumps(values).lower()))
+
+
+# --------------------------------------------------
+# Server
+# --------------------------------------------------
+class _FakeMeilisearchRequestHandler(BaseHTTPRequestHandler):
+    server: "FakeMeilisearchServer"
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_PUT(self) -> None:
+        self._handle("PUT")
+
+    def do_PATCH(self) -> None:
+        self._handle("PATCH")
+
+    def do_DELETE(self) -> None:
+        self._handle("DELETE")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _handle(self, method: str) -> None:
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            body = self._read_body()
+            with self.server.meilisearch.lock:
+                status, response = self.server.meilisearch.handle(
+                    method, url.path, query, body
+                )
+        except FakeMeilisearchError as error:
+            status, response = error.status, error.to_dict()
+        data = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self) -> Any:
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        if len(raw) == 0:
+            return None
+        try:
+            if self.headers.get("Content-Type") == "application/x-ndjson":
+                return [json.loads(line) for line in raw.splitlines() if line.strip()]
+            return json.loads(raw)
+        except ValueError as error:
+            raise FakeMeilisearchError(400, "malformed_payload", str(error)) from None
+
+
+class FakeMeilisearchServer(ThreadingHTTPServer):
+    """Serves a `FakeMeilisearch` on localhost from a background thread."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), _FakeMeilisearchRequestHandler)
+        self.meilisearch = FakeMeilisearch()
+        self._thread: Optional[Thread] = None
+
+    def __enter__(self) -> "FakeMeilisearchServer":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def start(self) -> "FakeMeilisearchServer":
+        """Starts serving in a daemon thread."""
+        self._thread = Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving and closes the socket."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def reset(self) -> None:
+        """Removes every index and task."""
+        with self.meilisearch.lock:
+            self.meilisearch.reset()
+
+    def client(self, api_key: str = "fake") -> Client:
+        """Returns a Meilisearch client connected to this server."""
+        return Client(self.url, api_key)
@@ -0,0 +1,116 @@
+from collections import deque
+from itertools import chain
+from math import ceil
+from threading import Lock
+from typing import Deque, Dict, List, Optional, Protocol, Tuple
+
+INDEX_FETCH_SECONDS = "index.fetch.seconds"
+INDEX_FETCH_ROWS = "index.fetch.rows"
+INDEX_BUILD_SECONDS = "index.build.seconds"
+INDEX_BUILD_DOCUMENTS = "index.build.documents"
+INDEX_UPLOAD_SECONDS = "index.upload.seconds"
+INDEX_UPLOAD_BYTES = "index.upload.bytes"
+INDEX_DOCUMENTS_PER_SECOND = "index.documents_per_second"
+INDEX_THROTTLED_SECONDS = "index.throttled.seconds"
+SEARCH_CLIENT_SECONDS = "search.client.seconds"
+SEARCH_SERVER_SECONDS = "search.server.seconds"
+
+SeriesKey = Tuple[str, Optional[str]]
+
+
+class MetricsSink(Protocol):
+    """Receives the measurements emitted by the indexers."""
+
+    def observe(self, name: str, value: float, tags: Dict[str, str]) -> None: ...
+
+
+class InMemoryMetrics:
+    """
+    A thread-safe `MetricsSink` that aggregates measurements by name and indexer.
+
+    Percentiles only cover the last `max_samples` measurements of each indexer.
+    """
+
+    def __init__(self, max_samples: int = 10_000) -> None:
+        self.max_samples = max_samples
+        self._lock = Lock()
+        self._samples: Dict[SeriesKey, Deque[float]] = {}
+        self._totals: Dict[SeriesKey, List[float]] = {}
+
+    def observe(self, name: str, value: float, tags: Dict[str, str]) -> None:
+        key = (name, tags.get("indexer"))
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.max_samples)
+                self._totals[key] = [0, 0.0, value, value]
+            self._samples[key].append(value)
+            totals = self._totals[key]
+            totals[0] += 1
+            totals[1] += value
+            totals[2] = min(totals[2], value)
+            totals[3] = max(totals[3], value)
+
+    def percentile(
+        self, name: str, percent: float, indexer: Optional[str] = None
+    ) -> float:
+        """Returns the given percentile (nearest rank) of the metric."""
+        with self._lock:
+            values = sorted(
+                chain.from_iterable(
+                    samples
+                    for key, samples in self._samples.items()
+                    if self._matches(key, name, indexer)
+                )
+            )
+        if len(values) == 0:
+            return 0.0
+        rank = max(ceil(percent / 100 * len(values)), 1)
+        return values[rank - 1]
+
+    def summary(self, indexer: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Returns the count, total, mean, min, max and percentiles of each metric."""
+        with self._lock:
+            series = [
+                (name, list(totals))
+                for (name, series_indexer), totals in self._totals.items()
+                if indexer is None or series_indexer == indexer
+            ]
+        totals_by_name: Dict[str, List[float]] = {}
+        for name, (count, total, minimum, maximum) in series:
+            if name not in totals_by_name:
+                totals_by_name[name] = [count, total, minimum, maximum]
+                continue
+            totals = totals_by_name[name]
+            totals[0] += count
+            totals[1] += total
+            totals[2] = min(totals[2], minimum)
+            totals[3] = max(totals[3], maximum)
+        summary = {}
+        for name, (count, total, minimum, maximum) in totals_by_name.items():
+            summary[name] = {
+                "count": count,
+                "total": total,
+                "mean": total / count,
+                "min": minimum,
+                "max": maximum,
+                "p50": self.percentile(name, 50, indexer),
+                "p90": self.percentile(name, 90, indexer),
+                "p99": self.percentile(name, 99, indexer),
+            }
+        return summary
+
+    def summary_by_indexer(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Returns the `summary` of each indexer that emitted measurements."""
+        with self._lock:
+            indexers = {indexer for _, indexer in self._samples if indexer is not None}
+        return {indexer: self.summary(indexer) for indexer in sorted(indexers)}
+
+    def reset(self) -> None:
+        """Removes every measurement."""
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+    @staticmethod
+    def _matches(key: SeriesKey, name: str, indexer: Optional[str]) -> bool:
+        return key[0] == name and (indexer is None or key[1] == indexer)
@@ -1,6 +1,42 @@
-from typing import List, Tuple
+from functools import lru_cache
+from typing import Any, List, Mapping, NamedTuple, Optional, Tuple, Union, Unpack
 
-from jklib.meili.types import MeilisearchFilterValue
+from jklib.meili.types import (
+    MeilisearchFilters,
+    MeilisearchFilterShape,
+    MeilisearchFilterValue,
+)
+
+FILTER_OPERATORS = [
+    "is_empty",
+    "is_not_empty",
+    "is_null",
+    "is_not_null",
+    "one_of",
+    "none_of",
+    "all_of",
+    "eq",
+    "neq",
+    "gt",
+    "gte",
+    "lt",
+    "lte",
+]
+UNARY_OPERATORS = {
+    "is_empty": "IS EMPTY",
+    "is_not_empty": "IS NOT EMPTY",
+    "is_null": "IS NULL",
+    "is_not_null": "IS NOT NULL",
+}
+LIST_OPERATORS = {"one_of": "IN", "none_of": "NOT IN", "all_of": "="}
+COMPARISON_OPERATORS = {
+    "eq": "=",
+    "neq": "!=",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<=",
+}
 
 
 def build_search_filter(
@@ -51,3 +87,137 @@ def build_search_filter(
     if lte is not None:
         filters.extend([f"{field} <= {value}" for field, value in lte])
     return " AND ".join(filters)
+
+
+def escape_filter_value(value: MeilisearchFilterValue) -> str:
+    """
+    Returns the value as a filter literal, with strings quoted and escaped.
+
+    Strings ending with a backslash, or with one before a quote, raise a `ValueError`.
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        if value.endswith("\\") or '\\"' in value:
+            raise ValueError(f"Cannot escape {value!r} in a filter")
+        escaped = value.replace('"', '\\"')
+        return f'"{escaped}"'
+    return str(value)
+
+
+class BoundSearchFilter(NamedTuple):
+    """A compiled filter with its values bound, ready to be sent."""
+
+    expression: str
+
+
+class CompiledSearchFilter:
+    """
+    A filter shape (which operators apply to which fields) compiled once.
+
+    Values are then bound on each call with `bind`, using the same keys as the
+    shape: one value per field for comparison operators, a list of values per
+    field for `one_of`/`none_of`/`all_of`, and nothing for the `is_*` ones.
+    Unlike `build_search_filter`, string values are quoted and escaped.
+
+    Example:
+        price_filter = compile_search_filter(eq=["category"], gte=["price"])
+        price_filter.bind(eq=["books"], gte=[10])  # 'category = "books" AND price >= 10'
+    """
+
+    def __init__(self, shape: MeilisearchFilterShape) -> None:
+        self.shape = shape
+        self._key = _shape_key(shape)
+        self._hash = hash(self._key)
+        self._operands = [
+            (op, fields, op in LIST_OPERATORS)
+            for op, fields in self._key
+            if op not in UNARY_OPERATORS
+        ]
+        self._static = " AND ".join(
+            f"{field} {UNARY_OPERATORS[op]}"
+            for op, fields in self._key
+            if op in UNARY_OPERATORS
+            for field in fields
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CompiledSearchFilter) and self._key == other._key
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def bind(self, **values: List[Any]) -> BoundSearchFilter:
+        """Binds the values to the compiled shape."""
+        frozen = tuple(
+            tuple(map(tuple, values.get(op, ())))
+            if is_list
+            else tuple(values.get(op, ()))
+            for op, _, is_list in self._operands
+        )
+        # `True`, `1` and `1.0` are equal but rendered differently
+        types: Tuple[Tuple[Any, ...], ...] = tuple(
+            tuple(tuple(type(v) for v in value) for value in op_values)
+            if is_list
+            else tuple(type(value) for value in op_values)
+            for (_, _, is_list), op_values in zip(self._operands, frozen)
+        )
+        return BoundSearchFilter(_render_search_filter(self, frozen, types))
+
+    def render(self, frozen_values: Tuple[Tuple[Any, ...], ...]) -> str:
+        """Builds the filter expression from the frozen values of `bind`."""
+        filters = [self._static] if self._static else []
+        for (op, fields, _), op_values in zip(self._operands, frozen_values):
+            if len(op_values) != len(fields):
+                raise ValueError(
+                    f"Expected {len(fields)} value(s) for '{op}', got {len(op_values)}"
+                )
+            for field, value in zip(fields, op_values):
+                if op == "all_of":
+                    filters.extend(f"{field} = {escape_filter_value(v)}" for v in value)
+                elif op in LIST_OPERATORS:
+                    value_str = ", ".join(escape_filter_value(v) for v in value)
+                    filters.append(f"{field} {LIST_OPERATORS[op]} [{value_str}]")
+                else:
+                    filters.append(
+                        f"{field} {COMPARISON_OPERATORS[op]} {escape_filter_value(value)}"
+                    )
+        return " AND ".join(filters)
+
+
+SearchFilter = Union[MeilisearchFilters, BoundSearchFilter]
+ShapeKey = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+def compile_search_filter(
+    **shape: Unpack[MeilisearchFilterShape],
+) -> CompiledSearchFilter:
+    """Compiles a filter shape once, to bind values to it on each call."""
+    return _compile_search_filter(_shape_key(shape))
+
+
+@lru_cache(maxsize=256)
+def _compile_search_filter(key: ShapeKey) -> CompiledSearchFilter:
+    return CompiledSearchFilter({op: list(fields) for op, fields in key})  # type: ignore
+
+
+@lru_cache(maxsize=1024)
+def _render_search_filter(
+    compiled: CompiledSearchFilter,
+    frozen_values: Tuple[Tuple[Any, ...], ...],
+    value_types: Tuple[Tuple[Any, ...], ...],
+) -> str:
+    # `value_types` is only part of the cache key
+    return compiled.render(frozen_values)
+
+
+def _shape_key(shape: Mapping[str, Any]) -> ShapeKey:
+    """Returns a hashable version of the shape, in the canonical order."""
+    return tuple((op, tuple(shape[op])) for op in FILTER_OPERATORS if shape.get(op))
+
+
+def resolve_search_filter(filters: Optional[SearchFilter]) -> Optional[str]:
+    """Returns the filter expression of either a filters dict or a bound filter."""
+    if isinstance(filters, BoundSearchFilter):
+        return filters.expression or None
+    return build_search_filter(**(filters or {})) or None
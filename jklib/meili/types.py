@@ -62,6 +62,22 @@ class MeilisearchFilters(TypedDict, total=False):
     lte: List[Tuple[str, MeilisearchFilterValue]]
 
 
+class MeilisearchFilterShape(TypedDict, total=False):
+    is_empty: List[str]
+    is_not_empty: List[str]
+    is_null: List[str]
+    is_not_null: List[str]
+    one_of: List[str]
+    none_of: List[str]
+    all_of: List[str]
+    eq: List[str]
+    neq: List[str]
+    gt: List[str]
+    gte: List[str]
+    lt: List[str]
+    lte: List[str]
+
+
 class MeilisearchSearchParameters(TypedDict, total=False):
     offset: Optional[int]
     limit: Optional[int]
@@ -83,6 +99,14 @@ class MeilisearchSearchParameters(TypedDict, total=False):
     attributesToSearchOn: Optional[List[str]]
 
 
+# A list of documents, or its encoded NDJSON payload
+MeilisearchDocumentsBatch = Union[List[Dict[str, Any]], bytes]
+
+MeilisearchQuery = Tuple[
+    str, Optional[MeilisearchFilters], Optional[MeilisearchSearchParameters]
+]
+
+
 class MeilisearchSearchHits(TypedDict, total=False):
     hits: List[Dict[str, Any]]
 
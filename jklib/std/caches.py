@@ -0,0 +1,43 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """Thread-safe, bounded LRU cache whose entries can expire after a TTL."""
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, Tuple[Optional[float], Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the value if it exists and has not expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at is None or expires_at > monotonic():
+                    self._data.move_to_end(key)
+                    return value
+                del self._data[key]
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Stores the value and evicts the least recently used entries."""
+        expires_at = monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Removes all the entries."""
+        with self._lock:
+            self._data.clear()
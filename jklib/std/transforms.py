@@ -1,5 +1,5 @@
 import json
-from typing import Any, Dict, List, OrderedDict, Union
+from typing import Any, Dict, Iterator, List, Optional, OrderedDict, Tuple, Union
 
 
 def array2d_to_dict(array2d: List[List], col_index: int) -> Dict[Any, List]:
@@ -34,37 +34,136 @@ def array2d_to_dict_cols(array2d: List[List], cols: List[str]) -> Dict[Any, List
 
 
 def dict_to_flat_dict(data: Dict[str, Any]) -> Dict[str, Union[str, int, bool]]:
-    """Recursively flattens a dict.
+    """Flattens a nested dict, skipping None and empty string values.
 
     Keys for nested arrays or dicts might look like this:
     'key[0][subkey][3]'
     """
-    flat_dict = {}
-
-    def _convert_value(current_path: str, current_value: Any) -> None:
-        # Undefined values are skipped
-        if current_value is None or current_value == "":
-            return
-        # Array: Add index to path for each value and recurse
-        if type(current_value) == list:  # noqa
-            for i, sub_value in enumerate(current_value):
-                new_path = f"{current_path}[{i}]"
-                _convert_value(new_path, sub_value)
-            return
-        # Object: Add key to path for each value and recurse
-        if type(current_value) == dict:  # noqa
-            for sub_key, sub_value in current_value.items():
-                new_path = f"{current_path}[{str(sub_key)}]"
-                _convert_value(new_path, sub_value)
-            return
-        # All other cases: Set value
-        flat_dict[current_path] = current_value
-
-    for key, value in data.items():
-        _convert_value(str(key), value)
-    return flat_dict
+    return dict(iter_flat_items(data))
+
+
+def flat_dict_to_dict(
+    flat_dict: Dict[str, Any], max_list_gap: int = 100
+) -> Dict[str, Any]:
+    """Rebuilds the nested dict of a flat dict (inverse of `dict_to_flat_dict`).
+
+    Raises a ValueError for list indexes more than `max_list_gap` items past the
+    end of their list, and for siblings mixing numeric and non-numeric keys.
+    """
+    data: Dict[str, Any] = {}
+    # Siblings are usually consecutive, so parents are looked up by their path
+    parents: Dict[str, Union[Dict[str, Any], List[Any]]] = {}
+    parent: Optional[Union[Dict[str, Any], List[Any]]]
+    for path, value in flat_dict.items():
+        if "[" not in path:
+            parent_path, parent, key = "", data, path
+        elif path.endswith("]"):
+            parent_path, _, key = path[:-1].rpartition("[")
+            parent = parents.get(parent_path)
+            if parent is None:
+                parent = parents[parent_path] = _get_parent(
+                    data, parent_path, key, max_list_gap
+                )
+            _check_nested_key(parent, key)
+        else:
+            raise ValueError(f"'{path}' is not a valid flat dict key")
+        if isinstance(_get_item(parent, key), (dict, list)):
+            raise ValueError(f"'{path}' conflicts with the values of its children")
+        _set_item(parent, key, value, max_list_gap)
+    return data
+
+
+def iter_flat_items(data: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """Lazily yields the (path, value) pairs of `dict_to_flat_dict`."""
+    stack: List[Tuple[Optional[str], Iterator[Tuple[Any, Any]]]] = [
+        (None, iter(data.items()))
+    ]
+    while len(stack) > 0:
+        parent_path, items = stack[-1]
+        for key, value in items:
+            path = str(key) if parent_path is None else f"{parent_path}[{key}]"
+            # Undefined values are skipped
+            if value is None or value == "":
+                continue
+            # Arrays and objects: Resume the parent once they are flattened
+            if type(value) is list:
+                stack.append((path, iter(enumerate(value))))
+                break
+            if type(value) is dict:
+                stack.append((path, iter(value.items())))
+                break
+            yield path, value
+        else:
+            stack.pop()
 
 
 def ordered_dict_to_dict(ordered_dict: OrderedDict) -> Dict[Any, Any]:
     """Converts an OrderedDict to a dict."""
     return json.loads(json.dumps(ordered_dict))
+
+
+def _get_item(container: Union[Dict[str, Any], List[Any]], key: str) -> Any:
+    if isinstance(container, list):
+        index = _list_index(key)
+        return container[index] if index < len(container) else None
+    return container.get(key)
+
+
+def _check_nested_key(container: Union[Dict[str, Any], List[Any]], key: str) -> None:
+    """Rejects numeric keys in nested dicts, whatever the order of the siblings."""
+    if isinstance(container, dict) and key.isdecimal():
+        raise ValueError(f"'{key}' is a list index among non-numeric keys")
+
+
+def _list_index(key: str) -> int:
+    if not key.isdecimal():
+        raise ValueError(f"'{key}' is not a valid list index")
+    return int(key)
+
+
+def _set_item(
+    container: Union[Dict[str, Any], List[Any]],
+    key: str,
+    value: Any,
+    max_list_gap: int,
+) -> None:
+    if isinstance(container, list):
+        index = _list_index(key)
+        if index - len(container) > max_list_gap:
+            raise ValueError(
+                f"List index {index} is more than {max_list_gap} items past its end"
+            )
+        if index >= len(container):
+            container.extend([None] * (index + 1 - len(container)))
+        container[index] = value
+    else:
+        container[key] = value
+
+
+def _get_parent(
+    data: Dict[str, Any], parent_path: str, key: str, max_list_gap: int
+) -> Union[Dict[str, Any], List[Any]]:
+    """Returns the container at the path, creating it and its parents if needed."""
+    keys = _split_flat_key(parent_path) + [key]
+    container: Any = data
+    for current_key, next_key in zip(keys, keys[1:]):
+        if container is not data:
+            _check_nested_key(container, current_key)
+        child = _get_item(container, current_key)
+        if child is None:
+            child = [] if next_key.isdecimal() else {}
+            _set_item(container, current_key, child, max_list_gap)
+        elif not isinstance(child, (dict, list)):
+            raise ValueError(f"'{parent_path}' conflicts with a value of its parent")
+        container = child
+    return container
+
+
+def _split_flat_key(path: str) -> List[str]:
+    """Splits 'key[0][subkey]' into ['key', '0', 'subkey']."""
+    key, bracket, subkeys = path.partition("[")
+    if bracket == "":
+        return [key]
+    if not subkeys.endswith("]"):
+        raise ValueError(f"'{path}' is not a valid flat dict key")
+    return [key, *subkeys[:-1].split("][")]